@@ -0,0 +1,84 @@
+"""
+Бенчмарк кодеков сжатия записей кэша ответов.
+
+Строит из tests/functional/testdata/elastic/movies.json тела ответов,
+которые API кладет в кэш (отдельные фильмы и страницы списка разного
+размера), и для каждого доступного кодека считает сэкономленный объем
+и время сжатия/распаковки.
+
+Запуск из каталога api_service:
+
+    python benchmarks/codecs.py --page-sizes 50 1000
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import orjson  # noqa: E402
+
+from models.filmwork import FilmWork  # noqa: E402
+from services.cache import available_codecs  # noqa: E402
+
+MOVIES = ROOT / "tests" / "functional" / "testdata" / "elastic" / "movies.json"
+
+
+def render(docs: list[dict]) -> bytes:
+    return orjson.dumps([FilmWork(**doc).dict() for doc in docs])
+
+
+def build_payloads(page_sizes: list[int]) -> dict[str, list[bytes]]:
+    with MOVIES.open() as file:
+        movies = json.load(file)
+
+    payloads = {"film by id": [orjson.dumps(FilmWork(**movie).dict()) for movie in movies]}
+    for size in page_sizes:
+        payloads[f"page_size={size}"] = [
+            render(movies[start:start + size]) for start in range(0, len(movies), size)
+        ]
+    return payloads
+
+
+def measure(codec, payloads: list[bytes], repeat: int) -> tuple[int, float, float]:
+    compressed = [codec.compress(payload) for payload in payloads]
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            codec.compress(payload)
+    compress_time = (time.perf_counter() - started) / (repeat * len(payloads))
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for data in compressed:
+            codec.decompress(data)
+    decompress_time = (time.perf_counter() - started) / (repeat * len(payloads))
+
+    return sum(map(len, compressed)), compress_time, decompress_time
+
+
+def main(args):
+    for name, payloads in build_payloads(args.page_sizes).items():
+        raw_size = sum(map(len, payloads))
+        print(f"\n{name}: {len(payloads)} values, {raw_size / 1024:.1f} KiB raw")
+        print(f"{'codec':<8}{'KiB':>10}{'saved':>8}{'compress µs':>14}{'decompress µs':>16}")
+        for codec_name, codec_type in available_codecs().items():
+            size, compress_time, decompress_time = measure(codec_type(args.level), payloads, args.repeat)
+            print(
+                f"{codec_name:<8}{size / 1024:>10.1f}{1 - size / raw_size:>8.0%}"
+                f"{compress_time * 1e6:>14.1f}{decompress_time * 1e6:>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[50, 1000])
+    parser.add_argument("--level", type=int, default=None, help="compression level")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
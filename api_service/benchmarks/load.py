@@ -0,0 +1,233 @@
+"""
+Нагрузочный бенчмарк API на локальных заменах Elasticsearch и Redis.
+
+Запускает `main:app` в том же процессе, без сети и контейнеров: Elasticsearch
+заменен индексами в памяти из tests/functional/testdata/elastic/*.json,
+Redis - словарем (см. `db.fake_elastic` и `db.fake_redis`). Запросы проходят весь стек приложения, включая проверку токена.
+
+Воспроизводит смесь запросов, похожую на реальную: фильмы и участники по id
+(популярные запрашиваются чаще), страницы списка фильмов, поиск, жанры.
+Печатает RPS, p50/p95/p99 по видам запросов и долю попаданий в кэш, чтобы
+сравнивать производительность между коммитами.
+
+Запуск из каталога api_service:
+
+    python benchmarks/load.py --requests 5000 --concurrency 50
+    python benchmarks/load.py --json results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import httpx  # noqa: E402
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+
+import main  # noqa: E402
+from core import auth, metrics  # noqa: E402
+from db import elastic, redis  # noqa: E402
+from db.fake_elastic import FakeElasticsearch, words  # noqa: E402
+from db.fake_redis import FakeRedis  # noqa: E402
+from services import base  # noqa: E402
+from services.genre import genre_catalog  # noqa: E402
+
+TEST_DATA = ROOT / "tests" / "functional" / "testdata" / "elastic"
+INDICES = ("movies", "persons", "genres")
+
+# Доли видов запросов в смеси
+MIX = {
+    "film by id": 40,
+    "film list": 25,
+    "film search": 15,
+    "person by id": 10,
+    "person search": 5,
+    "genres": 5,
+}
+
+
+def load_indices() -> dict[str, list[dict]]:
+    return {index: json.loads(TEST_DATA.joinpath(f"{index}.json").read_text()) for index in INDICES}
+
+
+def create_token() -> str:
+    """
+    Включает локальную проверку токенов и выпускает токен пользователя.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    auth.public_key = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    auth.algorithm = "RS256"
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "jti": str(uuid.uuid4()),
+        "type": "access",
+        "roles": ["user"],
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, key, algorithm="RS256")
+
+
+def request_mix(indices: dict[str, list[dict]], seed: int) -> Iterator[tuple[str, str]]:
+    """
+    Бесконечная последовательность запросов (вид, url).
+
+    Популярность фильмов и участников распределена по закону Ципфа:
+    небольшая часть документов получает большую часть запросов.
+    """
+    rng = random.Random(seed)
+    movies = [doc["id"] for doc in indices["movies"]]
+    persons = [doc["id"] for doc in indices["persons"]]
+    genres = [doc["name"] for doc in indices["genres"]]
+    title_words = sorted({word for doc in indices["movies"] for word in words(doc["title"]) if len(word) > 3})
+    person_words = sorted({doc["last_name"] for doc in indices["persons"] if doc.get("last_name")})
+    rng.shuffle(movies)
+    rng.shuffle(persons)
+    movie_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(movies) + 1)))
+    person_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(persons) + 1)))
+
+    kinds, weights = zip(*MIX.items())
+    while True:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "film by id":
+            url = f"/api/v1/film/{rng.choices(movies, cum_weights=movie_weights)[0]}"
+        elif kind == "film list":
+            url = f"/api/v1/film/?page_number={min(int(rng.expovariate(0.5)), 19)}&page_size=50" \
+                  f"&sort={rng.choice(['imdb_rating', '-imdb_rating'])}"
+            if rng.random() < 0.3:
+                url += f"&genre={rng.choice(genres)}"
+        elif kind == "film search":
+            url = f"/api/v1/film/search/?query={rng.choice(title_words)}&page_size=20"
+        elif kind == "person by id":
+            url = f"/api/v1/person/{rng.choices(persons, cum_weights=person_weights)[0]}"
+        elif kind == "person search":
+            url = f"/api/v1/person/search/?query={rng.choice(person_words)}&page_size=20"
+        else:
+            url = "/api/v1/genre/"
+        yield kind, url
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+def cache_lookups() -> dict[str, Counter]:
+    """
+    Текущие значения счетчиков обращений к кэшу: уровень -> результат -> число.
+    """
+    counts = defaultdict(Counter)
+    for sample in next(iter(metrics.CACHE_LOOKUPS.collect())).samples:
+        if sample.name.endswith("_total"):
+            counts[sample.labels["level"]][sample.labels["result"]] += sample.value
+    return counts
+
+
+def cache_hit_ratios(before: dict[str, Counter]) -> dict[str, float]:
+    """
+    Доля попаданий в кэш с момента снимка `before`.
+    """
+    counts = {level: results - before.get(level, Counter()) for level, results in cache_lookups().items()}
+    return {
+        level: (results["hit"] + results["stale"]) / total
+        for level, results in counts.items()
+        if (total := sum(results.values()))
+    }
+
+
+async def run(args) -> dict:
+    indices = load_indices()
+    es = FakeElasticsearch(indices, args.latency)
+    redis.redis, elastic.es = FakeRedis(args.redis_latency), es
+    base.local_cache.clear()
+    await genre_catalog.refresh(es)
+
+    headers = {"Authorization": f"Bearer {create_token()}"}
+    mix = request_mix(indices, args.seed)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses = Counter()
+
+    async with httpx.AsyncClient(app=main.app, base_url="http://api", headers=headers) as client:
+
+        async def worker(requests: Iterator[tuple[str, str]], record: bool) -> None:
+            for kind, url in requests:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if record:
+                    latencies[kind].append(time.perf_counter() - started)
+                    statuses[response.status_code] += 1
+
+        async def replay(count: int, record: bool) -> float:
+            requests = itertools.islice(mix, count)
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(requests, record) for _ in range(args.concurrency)))
+            return time.perf_counter() - started
+
+        if args.warmup:
+            await replay(args.warmup, record=False)
+        # Обращения к Elasticsearch и кэшу считаются без прогрева, как и задержки.
+        es.calls.clear()
+        lookups = cache_lookups()
+        elapsed = await replay(args.requests, record=True)
+
+    every = [latency for values in latencies.values() for latency in values]
+    return {
+        "requests": len(every),
+        "concurrency": args.concurrency,
+        "es_latency_ms": args.latency * 1000,
+        "rps": len(every) / elapsed,
+        "statuses": dict(statuses),
+        "es_calls": dict(es.calls),
+        "cache_hit_ratio": cache_hit_ratios(lookups),
+        "latency_ms": {
+            kind: {
+                "count": len(values),
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+            }
+            for kind, values in sorted(latencies.items(), key=lambda item: -len(item[1]))
+            + [("all", every)]
+        },
+    }
+
+
+def report(result: dict) -> None:
+    print(f"{result['requests']} requests, concurrency {result['concurrency']}, "
+          f"ES latency {result['es_latency_ms']:.0f} ms")
+    print(f"RPS: {result['rps']:.0f}  statuses: {result['statuses']}  ES calls: {result['es_calls']}")
+    print("cache hit ratio: " + ", ".join(f"{level} {ratio:.1%}" for level, ratio in result["cache_hit_ratio"].items()))
+    print(f"{'':<14}{'count':>7}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}")
+    for kind, stats in result["latency_ms"].items():
+        print(f"{kind:<14}{stats['count']:>7}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=0, help="requests before measuring")
+    parser.add_argument("--latency", type=float, default=0.002, help="ES latency, seconds")
+    parser.add_argument("--redis-latency", type=float, default=0.0002, help="Redis latency, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=4))
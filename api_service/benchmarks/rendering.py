@@ -0,0 +1,84 @@
+"""
+Бенчмарк построения тела ответа из документов Elasticsearch.
+
+Для страниц фильмов и участников из tests/functional/testdata/elastic
+сравнивает способы получить JSON ответа из `_source`:
+
+- pydantic: `Model(**doc).dict()` с полной валидацией;
+- construct: `Model.construct(**doc).dict()` без валидации, но и без
+  значений по умолчанию во вложенных моделях, поэтому ответ отличается;
+- shaper: `models.custom_model.shaper`, которым сервис строит ответы.
+
+Печатает время на страницу и на документ и совпадает ли ответ с pydantic.
+
+Запуск из каталога api_service:
+
+    python benchmarks/rendering.py --page-sizes 50 1000
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import orjson  # noqa: E402
+
+from models.custom_model import shaper  # noqa: E402
+from models.filmwork import FilmWork  # noqa: E402
+from models.person import Person  # noqa: E402
+
+TEST_DATA = ROOT / "tests" / "functional" / "testdata" / "elastic"
+
+RENDERERS = {
+    "pydantic": lambda model: lambda doc: model(**doc).dict(),
+    "construct": lambda model: lambda doc: model.construct(**doc).dict(),
+    "shaper": shaper,
+}
+
+
+def render(shape, docs: list[dict]) -> bytes:
+    return orjson.dumps([shape(doc) for doc in docs])
+
+
+def measure(shape, pages: list[list[dict]], repeat: int) -> float:
+    """
+    :return: среднее время построения одной страницы в секундах.
+    """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            render(shape, page)
+    return (time.perf_counter() - started) / (repeat * len(pages))
+
+
+def main(args):
+    for model, index in ((FilmWork, "movies"), (Person, "persons")):
+        docs = json.loads(TEST_DATA.joinpath(f"{index}.json").read_text())
+        for size in args.page_sizes:
+            pages = [docs[start:start + size] for start in range(0, len(docs), size)]
+            expected = [orjson.loads(render(RENDERERS["pydantic"](model), page)) for page in pages]
+
+            print(f"\n{model.__name__}, page_size={size}: {len(pages)} pages")
+            print(f"{'renderer':<12}{'µs/page':>12}{'µs/doc':>10}{'speedup':>10}  same output")
+            baseline = None
+            for name, renderer in RENDERERS.items():
+                shape = renderer(model)
+                page_time = measure(shape, pages, args.repeat)
+                baseline = baseline or page_time
+                same = [orjson.loads(render(shape, page)) for page in pages] == expected
+                print(
+                    f"{name:<12}{page_time * 1e6:>12.0f}{page_time / size * 1e6:>10.2f}"
+                    f"{baseline / page_time:>9.1f}x  {'yes' if same else 'no'}"
+                )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[50, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
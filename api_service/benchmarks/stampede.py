@@ -0,0 +1,66 @@
+"""
+Бенчмарк «набега» на Elasticsearch при истечении популярного ключа кэша.
+
+Запускает одновременную пачку запросов к одному url при пустом кэше
+и считает, сколько раз был вызван Elasticsearch в разных режимах:
+без объединения запросов, с объединением внутри процесса и
+с дополнительной блокировкой в Redis для нескольких процессов.
+
+Запуск из каталога api_service:
+
+    python benchmarks/stampede.py --requests 500 --workers 4
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core import config  # noqa: E402
+from db.fake_elastic import FakeElasticsearch  # noqa: E402
+from db.fake_redis import FakeRedis  # noqa: E402
+from services import base  # noqa: E402
+from services.filmwork import FilmService  # noqa: E402
+
+
+async def burst(requests: int, workers: int, latency: float) -> tuple[int, float]:
+    redis, elastic = FakeRedis(), FakeElasticsearch({"movies": []}, latency)
+    # Каждый экземпляр сервиса изображает отдельный процесс со своим SingleFlight.
+    services = [FilmService(redis, elastic) for _ in range(workers)]
+    base.local_cache.clear()
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            services[i % workers].get_films("/api/v1/film/", 0, 50, "imdb_rating")
+            for i in range(requests)
+        )
+    )
+    return elastic.calls["search"], time.perf_counter() - started
+
+
+async def main(args):
+    modes = [
+        ("no coalescing", False, False),
+        ("single-flight", True, False),
+        ("single-flight + redis lock", True, True),
+    ]
+    print(f"{args.requests} concurrent requests, {args.workers} workers, "
+          f"ES latency {args.latency * 1000:.0f} ms")
+    for name, single_flight, lock in modes:
+        config.CACHE_SINGLE_FLIGHT = single_flight
+        config.CACHE_LOCK_ENABLED = lock
+        calls, elapsed = await burst(args.requests, args.workers, args.latency)
+        print(f"{name:<28} ES calls: {calls:>5}  wall: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="ES latency, seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -1,39 +1,129 @@
 from http import HTTPStatus
-from typing import Optional
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from models.filmwork import FilmWork
+from core import config
+from models.facets import Facets
+from models.filmwork import FilmWork, FilmWorkFields, FilmWorkPage
 from services.filmwork import FilmService, get_film_service
-from utils import request_to_str
+from utils import json_response, profile_flag, request_to_str
 
 router = APIRouter()
 
 
+def check_batch_size(ids: list[str]) -> list[str]:
+    if len(ids) > config.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"no more than {config.BATCH_MAX_IDS} ids per request",
+        )
+    return ids
+
+
+@router.get("/batch", response_model=list[FilmWork])
+async def films_batch(
+    ids: list[str] = Query(...),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    """
+    Возвращает фильмы по списку id в порядке запроса.
+    Несуществующие фильмы пропускаются.
+
+    :param ids: идентификаторы фильмов: `?ids=...&ids=...` или через запятую.
+    """
+    ids = [id for value in ids for id in value.split(",") if id]
+    return json_response(await film_service.get_many(check_batch_size(ids)))
+
+
+@router.post("/batch", response_model=list[FilmWork])
+async def films_batch_post(
+    ids: list[str] = Body(..., embed=True),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    """
+    То же, что и `GET /batch`, для длинных списков: `{"ids": [...]}` в теле запроса.
+    """
+    return json_response(await film_service.get_many(check_batch_size(ids)))
+
+
+@router.get("/facets", response_model=Facets, dependencies=[Depends(profile_flag)])
+async def film_facets(
+    request: Request,
+    query: Optional[str] = None,
+    genre: Optional[str] = None,
+    genre_id: Optional[str] = None,
+    rating_from: Optional[float] = Query(None, ge=0),
+    rating_to: Optional[float] = Query(None, ge=0),
+    type: Optional[str] = Query(None, regex="^(movie|tv_show|series)$"),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    """
+    Возвращает число фильмов по жанрам и интервалам IMDB рейтинга.
+
+    :param query: текст для полнотекстового поиска, как в поиске фильмов.
+    Остальные параметры - фильтры, как в списке фильмов.
+    """
+    facets = await film_service.get_facets(
+        request_to_str(request),
+        query=query,
+        genre=genre,
+        genre_id=genre_id,
+        rating_from=rating_from,
+        rating_to=rating_to,
+        type=type,
+    )
+    return json_response(facets)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def films_export(
+    fields: Optional[str] = None,
+    film_service: FilmService = Depends(get_film_service),
+) -> StreamingResponse:
+    """
+    Выгружает все фильмы в NDJSON: по одному JSON-объекту на строку.
+
+    :param fields: поля фильмов через запятую, например `id,title,imdb_rating`.
+                   `id` возвращается всегда.
+    """
+    # При отключении клиента StreamingResponse отменяет выгрузку,
+    # и point-in-time закрывается в `finally` генератора.
+    chunks = await film_service.export(fields)
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+
 @router.get("/{film_id}", response_model=FilmWork)
 async def film_details(
-    request: Request,
     film_id: str,
     film_service: FilmService = Depends(get_film_service),
-) -> FilmWork:
+) -> Response:
     """
     Возвращает детальную информацию о фильме.
     """
-    film = await film_service.get_by_id(request_to_str(request), film_id)
+    film = await film_service.get_by_id(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
-    return film
+    return json_response(film)
 
 
-@router.get("/")
+@router.get("/", response_model=Union[list[FilmWork], list[FilmWorkFields], FilmWorkPage], dependencies=[Depends(profile_flag)])
 async def films(
     request: Request,
     page_number: int = Query(0, ge=0),
     page_size: int = Query(50, ge=0),
     sort: str = Query("imdb_rating", regex="-?imdb_rating$"),
     genre: Optional[str] = None,
+    genre_id: Optional[str] = None,
+    rating_from: Optional[float] = Query(None, ge=0),
+    rating_to: Optional[float] = Query(None, ge=0),
+    type: Optional[str] = Query(None, regex="^(movie|tv_show|series)$"),
+    cursor: Optional[str] = None,
+    pit: bool = False,
+    fields: Optional[str] = None,
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmWork]:
+) -> Response:
     """
     Возвращает информацию о фильмах с заданными условиями.
 
@@ -41,34 +131,63 @@ async def films(
     :param page_number: номер страницы.
     :param sort: сортировка по IMDB рейтингу.
                  `imdb_rating` - по возрастанию, `-imdb_rating` - по убыванию.
-    :param genre: жанр, по которому фильмы будут отфильтрованы.
+    :param genre: жанр, по которому фильмы будут отфильтрованы (точное название).
+    :param genre_id: идентификатор жанра, по которому фильмы будут отфильтрованы.
+    :param rating_from: минимальный IMDB рейтинг.
+    :param rating_to: максимальный IMDB рейтинг.
+    :param type: тип: `movie`, `tv_show` или `series`.
+    :param cursor: постраничный вывод по курсору вместо `page_number`.
+                   Пустое значение - первая страница. Ответ имеет вид
+                   `{"items": [...], "cursor": "..."}`, курсор передается
+                   в следующий запрос; на последней странице он `null`.
+    :param pit: все страницы по курсору строятся по одному снимку индекса.
+    :param fields: поля фильмов в ответе через запятую, например `id,title,imdb_rating`.
+                   `id` возвращается всегда.
     """
-    return await film_service.get_films(
+    films = await film_service.get_films(
         request_to_str(request),
         page_number=page_number,
         page_size=page_size,
         sort=sort,
         genre=genre,
+        genre_id=genre_id,
+        rating_from=rating_from,
+        rating_to=rating_to,
+        type=type,
+        cursor=cursor,
+        pit=pit,
+        fields=fields,
     )
+    return json_response(films)
 
 
-@router.get("/search/")
+@router.get("/search/", response_model=Union[list[FilmWork], list[FilmWorkFields], FilmWorkPage], dependencies=[Depends(profile_flag)])
 async def search_films(
     request: Request,
     query: str,
     page_number: int = Query(0, ge=0),
     page_size: int = Query(50, ge=0),
+    cursor: Optional[str] = None,
+    pit: bool = False,
+    fields: Optional[str] = None,
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmWork]:
+) -> Response:
     """
     :param query:
     :param page_size:
     :param page_number:
+    :param cursor: постраничный вывод по курсору, как в списке фильмов.
+    :param pit:
+    :param fields: поля в ответе через запятую.
     :param film_service:
     """
-    return await film_service.search_films(
+    films = await film_service.search_films(
         request_to_str(request),
         query=query,
         page_number=page_number,
         page_size=page_size,
+        cursor=cursor,
+        pit=pit,
+        fields=fields,
     )
+    return json_response(films)
@@ -1,21 +1,19 @@
 from http import HTTPStatus
-from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 from models.genre import Genre
 from services.genre import GenreService, get_genre_service
-from utils import request_to_str
+from utils import json_response, request_to_str
 
 router = APIRouter()
 
 
-@router.get("/{genre_id}")
+@router.get("/{genre_id}", response_model=Genre)
 async def genre_details(
-    request: Request,
     genre_id: str,
     genre_service: GenreService = Depends(get_genre_service),
-) -> Optional[Genre]:
+) -> Response:
     """
     Возвращает подробную информацию о жанре.
 
@@ -23,19 +21,20 @@ async def genre_details(
     :param genre_service: TODO
     :return:
     """
-    if genre := await genre_service.get_by_id(request_to_str(request), genre_id):
-        return genre
+    if genre := await genre_service.get_by_id(genre_id):
+        return json_response(genre)
     raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
 
 
-@router.get("/")
+@router.get("/", response_model=list[Genre])
 async def genre_list(
     request: Request, genre_service: GenreService = Depends(get_genre_service),
-) -> list[Genre]:
+) -> Response:
     """
     Возвращает список всех доступных жанров.
 
     :param genre_service: TODO
     :return:
     """
-    return await genre_service.genre_list(request_to_str(request))
+    genres = await genre_service.genre_list(request_to_str(request))
+    return json_response(genres)
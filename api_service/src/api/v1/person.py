@@ -1,46 +1,79 @@
 from http import HTTPStatus
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
 
-from models.person import Person
+from models.filmwork import FilmWorkShort
+from models.person import Person, PersonFields, PersonPage
 from services.person import PersonService, get_person_service
-from utils import request_to_str
+from utils import json_response, profile_flag, request_to_str
 
 router = APIRouter()
 
 
 @router.get("/{person_id}", response_model=Person)
 async def person_details(
-        request: Request,
         person_id: str,
         person_service: PersonService = Depends(get_person_service),
-) -> Person:
+) -> Response:
     """
     Возвращает детальную информацию об участнике.
     """
-    person = await person_service.get_by_id(request_to_str(request), person_id)
+    person = await person_service.get_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
-    return person
+    return json_response(person)
 
 
-@router.get("/search/")
+@router.get("/{person_id}/film", response_model=list[FilmWorkShort])
+async def person_films(
+    request: Request,
+    person_id: str,
+    page_number: int = Query(0, ge=0),
+    page_size: int = Query(50, ge=0),
+    person_service: PersonService = Depends(get_person_service),
+) -> Response:
+    """
+    Возвращает фильмы участника, отсортированные по убыванию IMDB рейтинга.
+    """
+    films = await person_service.get_films(
+        request_to_str(request),
+        person_id,
+        page_number=page_number,
+        page_size=page_size,
+    )
+    if films is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
+    return json_response(films)
+
+
+@router.get("/search/", response_model=Union[list[Person], list[PersonFields], PersonPage], dependencies=[Depends(profile_flag)])
 async def search_persons(
     request: Request,
     query: str,
     page_number: int = Query(0, ge=0),
     page_size: int = Query(50, ge=0),
+    cursor: Optional[str] = None,
+    pit: bool = False,
+    fields: Optional[str] = None,
     person_service: PersonService = Depends(get_person_service),
-) -> list[Person]:
+) -> Response:
     """
     :param query:
     :param page_size:
     :param page_number:
+    :param cursor: постраничный вывод по курсору, как в списке фильмов.
+    :param pit:
+    :param fields: поля в ответе через запятую.
     :param film_service:
     """
-    return await person_service.search_persons(
+    persons = await person_service.search_persons(
         request_to_str(request),
         query=query,
         page_number=page_number,
         page_size=page_size,
+        cursor=cursor,
+        pit=pit,
+        fields=fields,
     )
+    return json_response(persons)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Query, Response
+
+from core import config
+from models.suggestion import Suggestion
+from services.suggest import SuggestService, get_suggest_service
+from utils import json_response
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[Suggestion])
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    size: int = Query(10, ge=1, le=config.SUGGEST_MAX_SIZE),
+    suggest_service: SuggestService = Depends(get_suggest_service),
+) -> Response:
+    """
+    Подсказки для строки поиска: фильмы и участники, название или имя
+    которых содержит слово, начинающееся с `q`.
+
+    :param q: введенный текст.
+    :param size: число подсказок.
+    """
+    response = json_response(await suggest_service.suggest(q, size))
+    # Подсказки запрашиваются на каждое нажатие клавиши, поэтому разрешаем
+    # браузеру их кэшировать. Общим прокси нельзя: ответ требует авторизации.
+    response.headers["Cache-Control"] = f"private, max-age={config.SUGGEST_MAX_AGE_SECONDS}"
+    return response
@@ -0,0 +1,224 @@
+"""
+Проверка access-токенов, выпущенных сервисом авторизации.
+
+Сервис авторизации подписывает токены приватным ключом и публикует публичный
+ключ по адресу /auth/v1/public_key. Подпись, срок действия и роли проверяются
+на месте, а в общий с сервисом авторизации Redis мы ходим только за признаком
+отзыва токена. Если ключ недоступен, токен проверяется запросом к сервису
+авторизации.
+
+Принятые решения кэшируются в памяти процесса по хэшу токена, поэтому
+повторные запросы той же сессии проверку не выполняют.
+"""
+import hashlib
+import logging
+import time
+import uuid
+from http import HTTPStatus
+from typing import Mapping, Optional
+
+import jwt
+from aiobreaker import CircuitBreaker, CircuitBreakerError, CircuitBreakerListener
+from aioredis import Redis
+from httpx import AsyncClient, HTTPError, Limits, RequestError, Response
+
+from core import config
+from core.metrics import BreakerMetricsListener
+from core.local_cache import LocalCache
+
+# Публичный ключ и алгоритм подписи токенов.
+# Если ключ не задан в настройках, он загружается при старте приложения.
+public_key: Optional[str] = config.AUTH_PUBLIC_KEY
+algorithm: str = config.AUTH_JWT_ALGORITHM
+
+# Долгоживущий HTTP-клиент для запросов к сервису авторизации.
+# Создается при старте приложения.
+http_client: Optional[AsyncClient] = None
+
+# Кэш решений о доступе: sha256 токена -> HTTP-статус и роли пользователя.
+decisions = LocalCache(max_entries=config.AUTH_CACHE_MAX_ENTRIES)
+
+
+class TokenError(Exception):
+    """
+    Токен некорректен, просрочен или отозван.
+    """
+
+
+def create_http_client() -> AsyncClient:
+    return AsyncClient(
+        base_url=f"http://{config.AUTH_URL}",
+        timeout=config.AUTH_TIMEOUT_SECONDS,
+        limits=Limits(
+            max_connections=config.AUTH_MAX_CONNECTIONS,
+            max_keepalive_connections=config.AUTH_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+async def load_public_key() -> None:
+    """
+    Запрашивает публичный ключ у сервиса авторизации.
+
+    Если получить ключ не удалось, проверка токенов продолжит выполняться
+    запросом к сервису авторизации.
+    """
+    global public_key, algorithm
+
+    if public_key:
+        return
+
+    try:
+        answer = await http_client.get("/auth/v1/public_key", headers={"X-Request-Id": str(uuid.uuid4())})
+    except HTTPError as e:
+        logging.warning("Can't load auth public key: %r", e)
+        return
+
+    if answer.status_code != 200:
+        logging.warning("Auth public key is not available: %s", answer.status_code)
+        return
+
+    data = answer.json()
+    public_key, algorithm = data["public_key"], data["algorithm"]
+    logging.info("Loaded auth public key, algorithm %s", algorithm)
+
+
+def get_bearer_token(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Достает токен из заголовка `Authorization: Bearer <token>`.
+    """
+    scheme, _, token = headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+
+def decode_token(token: str) -> dict:
+    """
+    Проверяет подпись и срок действия access-токена и возвращает его содержимое.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            public_key,
+            algorithms=[algorithm],
+            options={"require": ["exp", "sub", "jti"]},
+        )
+    except jwt.PyJWTError as e:
+        raise TokenError(str(e)) from e
+
+    if payload.get("type") != "access":
+        raise TokenError("Not an access token")
+
+    return payload
+
+
+async def is_revoked(redis: Redis, payload: dict) -> bool:
+    """
+    Проверяет, отозван ли токен.
+
+    Использует те же ключи, что и `check_if_token_is_revoked` в сервисе
+    авторизации: `<jti>` для отдельного токена и `<user_id>-soa` после
+    выхода со всех устройств.
+    """
+    soa_flag, revoked = await redis.mget(f"{payload['sub']}-soa", payload["jti"])
+    return soa_flag is not None or revoked is not None
+
+
+async def verify_token(redis: Redis, token: str) -> dict:
+    """
+    Возвращает содержимое токена, если он действителен и не отозван.
+    """
+    payload = decode_token(token)
+    if await is_revoked(redis, payload):
+        raise TokenError("Token has been revoked")
+    return payload
+
+
+class LogListener(CircuitBreakerListener):
+    def state_change(self, breaker, old, new):
+        logging.info(f"{old.state} -> {new.state}")
+
+
+auth_breaker = CircuitBreaker(fail_max=5, listeners=[LogListener(), BreakerMetricsListener("auth")])
+
+
+@auth_breaker
+async def send_circuit_request(url: str, headers: dict) -> Response:
+    answer = await http_client.get(url, headers=headers)
+    logging.info(answer)
+    return answer
+
+
+async def authorize_remote(headers: Mapping[str, str]) -> tuple[HTTPStatus, dict]:
+    """
+    Проверка токена запросом к сервису авторизации.
+    """
+    # Передаем только нужные заголовки: заголовки соединения клиента
+    # (например, `Connection: close` от nginx) не дали бы переиспользовать соединение.
+    forward = {
+        name: headers[name]
+        for name in ("Authorization", "X-Request-Id")
+        if name in headers
+    }
+    try:
+        answer = await send_circuit_request("/auth/v1/authorize", headers=forward)
+    except (RequestError, CircuitBreakerError):
+        return HTTPStatus.UNAUTHORIZED, {}
+    if answer.status_code != HTTPStatus.OK:
+        return HTTPStatus.UNAUTHORIZED, {}
+    return HTTPStatus.OK, answer.json()
+
+
+async def authorize_local(redis: Redis, token: str) -> tuple[HTTPStatus, dict]:
+    try:
+        return HTTPStatus.OK, await verify_token(redis, token)
+    except TokenError:
+        return HTTPStatus.UNAUTHORIZED, {}
+
+
+def _decision_ttl(token: str, payload: dict) -> float:
+    """
+    Время жизни решения в кэше: не больше настройки и не дольше жизни токена.
+    """
+    if "exp" not in payload:
+        payload = jwt.decode(token, options={"verify_signature": False})
+    expire_in = payload.get("exp", 0) - time.time()
+    return min(config.AUTH_CACHE_TTL_SECONDS, expire_in)
+
+
+async def authorize(redis: Redis, headers: Mapping[str, str]) -> tuple[HTTPStatus, frozenset[str]]:
+    """
+    Проверяет право доступа к API.
+
+    :return: статус и роли пользователя. `OK` - доступ разрешен,
+        `UNAUTHORIZED` - токен отсутствует или недействителен,
+        `FORBIDDEN` - у пользователя нет ролей.
+    """
+    token = get_bearer_token(headers)
+    if token is None and public_key:
+        return HTTPStatus.UNAUTHORIZED, frozenset()
+
+    cache_key = hashlib.sha256(token.encode()).digest() if token else None
+    if cache_key and (decision := decisions.get(cache_key)) is not None:
+        return decision
+
+    if not public_key:
+        status, payload = await authorize_remote(headers)
+    else:
+        status, payload = await authorize_local(redis, token)
+
+    roles = frozenset(payload.get("roles") or ())
+    if status == HTTPStatus.OK and not roles:
+        # здесь должна быть проверка роли, если просто юзер, то одни данные, если подписчик - другие
+        status = HTTPStatus.FORBIDDEN
+
+    # Отказы из-за недействительного токена не кэшируем,
+    # чтобы мусорные токены не вытесняли полезные записи.
+    if cache_key and status != HTTPStatus.UNAUTHORIZED:
+        try:
+            decisions.set(cache_key, (status, roles), _decision_ttl(token, payload))
+        except jwt.PyJWTError:
+            pass
+
+    return status, roles
@@ -17,7 +17,119 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 ELASTIC_HOST = os.getenv("ELASTIC_HOST", "movies_elastic")
 ELASTIC_PORT = int(os.getenv("ELASTIC_PORT", 9200))
 
+# Замены Redis и Elasticsearch в памяти процесса для тестов и бенчмарков (см. `db.fake_redis`
+# и `db.fake_elastic`): `REDIS_BACKEND=fake`, `ELASTIC_BACKEND=fake`.
+REDIS_BACKEND = os.getenv("REDIS_BACKEND", "redis")
+ELASTIC_BACKEND = os.getenv("ELASTIC_BACKEND", "elasticsearch")
+# Каталог с документами индексов `<index>.json`, например tests/functional/testdata/elastic
+FAKE_ELASTIC_DATA_DIR = os.getenv("FAKE_ELASTIC_DATA_DIR", "")
+# Задержка ответов замен в миллисекундах
+FAKE_REDIS_LATENCY_MS = float(os.getenv("FAKE_REDIS_LATENCY_MS", 0))
+FAKE_ELASTIC_LATENCY_MS = float(os.getenv("FAKE_ELASTIC_LATENCY_MS", 0))
+
 # Корень проекта
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 AUTH_URL = os.getenv("AUTH_URL", "127.0.0.1:5000")
+
+# Настройки проверки access-токенов.
+# Публичный ключ (PEM) сервиса авторизации. Если не задан, запрашивается
+# у сервиса авторизации при старте приложения. Пустое значение - то же, что не задан.
+AUTH_PUBLIC_KEY = os.getenv("AUTH_PUBLIC_KEY") or None
+AUTH_JWT_ALGORITHM = os.getenv("AUTH_JWT_ALGORITHM", "RS256")
+
+# Пул соединений с сервисом авторизации
+AUTH_TIMEOUT_SECONDS = float(os.getenv("AUTH_TIMEOUT_SECONDS", 2))
+AUTH_MAX_CONNECTIONS = int(os.getenv("AUTH_MAX_CONNECTIONS", 100))
+AUTH_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AUTH_MAX_KEEPALIVE_CONNECTIONS", 20))
+
+# Кэш решений о доступе. Время жизни записи не превышает срок действия токена,
+# а также задает максимальную задержку применения отзыва токена.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 30))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10_000))
+
+# Кэш ответов первого уровня в памяти каждого процесса.
+# Время жизни должно быть меньше времени жизни записей в Redis.
+LOCAL_CACHE_TTL_SECONDS = int(os.getenv("LOCAL_CACHE_TTL_SECONDS", 10))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", 1000))
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Объединение одновременных промахов кэша по одному ключу внутри процесса
+CACHE_SINGLE_FLIGHT = os.getenv("CACHE_SINGLE_FLIGHT", "true").lower() == "true"
+# Блокировка в Redis, чтобы ключ пересчитывал только один процесс в кластере
+CACHE_LOCK_ENABLED = os.getenv("CACHE_LOCK_ENABLED", "false").lower() == "true"
+CACHE_LOCK_TIMEOUT_MS = int(os.getenv("CACHE_LOCK_TIMEOUT_MS", 5000))
+CACHE_LOCK_POLL_MS = int(os.getenv("CACHE_LOCK_POLL_MS", 50))
+
+# Через сколько секунд запись кэша ответов обновляется в фоне
+RESPONSE_CACHE_SOFT_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_SOFT_TTL_SECONDS", 60))
+# Сколько еще устаревшая запись хранится на случай недоступности Elasticsearch
+RESPONSE_CACHE_STALE_IF_ERROR_SECONDS = int(os.getenv("RESPONSE_CACHE_STALE_IF_ERROR_SECONDS", 60 * 60 * 24))
+
+# Кэшировать готовое тело ответа вместо ответа Elasticsearch
+CACHE_RESPONSE_BODY = os.getenv("CACHE_RESPONSE_BODY", "true").lower() == "true"
+
+# Сжатие записей кэша ответов в Redis: raw, zlib, lz4 или zstd.
+# Записи меньше CACHE_CODEC_MIN_SIZE байт не сжимаются.
+CACHE_CODEC = os.getenv("CACHE_CODEC", "zlib")
+CACHE_CODEC_LEVEL = int(os.environ["CACHE_CODEC_LEVEL"]) if os.getenv("CACHE_CODEC_LEVEL") else None
+CACHE_CODEC_MIN_SIZE = int(os.getenv("CACHE_CODEC_MIN_SIZE", 1024))
+
+# Время жизни записей кэша ответов. По сообщениям ETL записи измененных документов
+# удаляются, а страницы списков, поиска и агрегаций перестают использоваться
+# со сменой поколения списков индекса, поэтому срок можно увеличивать.
+RESPONSE_CACHE_EXPIRE_IN_SECONDS = int(os.getenv("RESPONSE_CACHE_EXPIRE_IN_SECONDS", 60 * 5))
+# Канал Redis, в который ETL публикует id измененных документов
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache-invalidation")
+
+# Как часто перечитывать номера поколений индексов из Redis
+CACHE_GENERATION_TTL_SECONDS = int(os.getenv("CACHE_GENERATION_TTL_SECONDS", 10))
+
+# Сколько помнить, что документа с запрошенным id нет в индексе
+NEGATIVE_CACHE_TTL_SECONDS = int(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", 30))
+
+# Глубже этой позиции страницы по номеру не отдаются (`index.max_result_window` в Elasticsearch)
+SEARCH_MAX_RESULT_WINDOW = int(os.getenv("SEARCH_MAX_RESULT_WINDOW", 10000))
+# Сколько Elasticsearch держит point-in-time между запросами страниц по курсору
+SEARCH_PIT_KEEP_ALIVE = os.getenv("SEARCH_PIT_KEEP_ALIVE", "1m")
+
+# Сколько фильмов можно запросить за раз через /api/v1/film/batch
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 100))
+
+# Поля фильмов и участников в ответах списков и поиска, если параметр `fields` не задан.
+# Например, `id,title,imdb_rating` для каталога. Пустое значение - все поля модели.
+FILM_LIST_FIELDS = os.getenv("FILM_LIST_FIELDS", "")
+FILM_SEARCH_FIELDS = os.getenv("FILM_SEARCH_FIELDS", "")
+PERSON_SEARCH_FIELDS = os.getenv("PERSON_SEARCH_FIELDS", "")
+
+# Как часто перезагружать каталог жанров в памяти и сколько жанров в нем может быть
+GENRE_CATALOG_REFRESH_SECONDS = int(os.getenv("GENRE_CATALOG_REFRESH_SECONDS", 60 * 5))
+GENRE_CATALOG_MAX_SIZE = int(os.getenv("GENRE_CATALOG_MAX_SIZE", 1000))
+
+# Подсказки для строки поиска: максимальное число подсказок
+# и сколько секунд браузер может их не перезапрашивать
+SUGGEST_MAX_SIZE = int(os.getenv("SUGGEST_MAX_SIZE", 20))
+SUGGEST_MAX_AGE_SECONDS = int(os.getenv("SUGGEST_MAX_AGE_SECONDS", 60))
+
+# Сколько жанров возвращать в /api/v1/film/facets и ширина интервалов рейтинга
+FACETS_GENRES_SIZE = int(os.getenv("FACETS_GENRES_SIZE", 100))
+FACETS_RATING_INTERVAL = float(os.getenv("FACETS_RATING_INTERVAL", 1))
+
+# Сколько фильмов читать из Elasticsearch за раз при выгрузке каталога
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+# Запросы к Elasticsearch дольше порога (в миллисекундах) пишутся в журнал `elastic.slow`
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))
+
+# Роль, с которой можно запросить профилирование запросов к Elasticsearch (`?profile=true`)
+PROFILE_ROLE = os.getenv("PROFILE_ROLE", "superuser")
+
+# Документы из Elasticsearch пишет наш ETL, поэтому при построении ответов они
+# не валидируются моделями (см. `models.custom_model.shaper`).
+# `true` включает полную валидацию pydantic, например для проверки новых данных.
+VALIDATE_ES_DOCUMENTS = os.getenv("VALIDATE_ES_DOCUMENTS", "false").lower() == "true"
+
+# Порт отдельного HTTP-сервера с метриками Prometheus. Порт внутренний: наружу его
+# не публикуют, метрики без авторизации доступны только из сети сервисов.
+# 0 - не запускать.
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
@@ -0,0 +1,50 @@
+"""
+Данные, привязанные к текущему HTTP-запросу.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+# Заголовки, которые слои ниже обработчика добавляют к ответу.
+# Словарь создается middleware для каждого запроса; задачи, запущенные
+# в ходе обработки запроса, получают ссылку на тот же словарь.
+response_headers: ContextVar[Optional[dict]] = ContextVar("response_headers", default=None)
+
+
+def add_response_header(name: str, value: str) -> None:
+    headers = response_headers.get()
+    if headers is not None:
+        headers[name] = value
+
+
+# Валидаторы записей кэша, из которых построен ответ: пары (ETag, max-age).
+# Список создается middleware для каждого запроса.
+cache_validators: ContextVar[Optional[list]] = ContextVar("cache_validators", default=None)
+
+
+def add_cache_validator(etag: str, max_age: int) -> None:
+    """
+    Сообщает, что ответ построен из записи кэша с хэшем `etag`,
+    которая останется свежей еще `max_age` секунд.
+    """
+    validators = cache_validators.get()
+    if validators is not None:
+        validators.append((etag, max_age))
+
+
+# Роли пользователя, выставляются при авторизации.
+user_roles: ContextVar[frozenset] = ContextVar("user_roles", default=frozenset())
+
+# Запросы к Elasticsearch выполняются с профилированием (`?profile=true`).
+profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+# Ключ кэша, для которого сейчас выполняется запрос к Elasticsearch.
+cache_key: ContextVar[Optional[str]] = ContextVar("cache_key", default=None)
+
+
+def append_response_header(name: str, value: str) -> None:
+    """
+    Добавляет значение к заголовку со списком значений через запятую.
+    """
+    headers = response_headers.get()
+    if headers is not None:
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LocalCache:
+    """
+    LRU-кэш в памяти процесса.
+
+    Размер ограничен числом записей и, опционально, суммарным объемом
+    в байтах; у каждой записи свое время жизни. При переполнении вытесняются
+    давно не использованные записи.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        value, expire_at, _ = item
+        if expire_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float, size: int = 0) -> None:
+        """
+        Сохраняет значение на `ttl` секунд.
+
+        :param size: объем значения в байтах, учитывается при ограничении `max_bytes`.
+        """
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self.size += size
+
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self.size > self.max_bytes
+        ):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        item = self._remove(key)
+        return item[0] if item else None
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+    def _remove(self, key: Hashable) -> Optional[tuple[Any, float, int]]:
+        item = self._data.pop(key, None)
+        if item:
+            self.size -= item[2]
+        return item
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._data),
+            "bytes": self.size,
+        }
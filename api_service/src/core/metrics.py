@@ -0,0 +1,133 @@
+"""
+Метрики Prometheus.
+
+Метрики собираются в реестр по умолчанию и отдаются отдельным HTTP-сервером
+на внутреннем порту `METRICS_PORT` (см. `start_metrics_server`), а не через API:
+порт API публичный, а метрики раскрывают трафик по маршрутам, долю отказов
+в доступе и состояние предохранителей. Приложение запускается одним процессом
+uvicorn, поэтому режим нескольких процессов `prometheus_client` не нужен.
+
+Маршрут в метриках запросов - шаблон пути обработчика (`/api/v1/film/{film_id}`),
+а не сам путь, чтобы число меток было ограничено.
+"""
+from functools import lru_cache
+
+from aiobreaker import CircuitBreakerListener
+from prometheus_client import Counter, Enum, Gauge, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.types import ASGIApp, Scope
+
+# Маршрут запросов, не дошедших до обработчика: отклоненных при авторизации
+# или с несуществующим путем.
+UNKNOWN_ROUTE = "other"
+
+# Задержки сервиса в основном миллисекундные, верхние корзины - для выгрузки
+# и таймаутов Elasticsearch.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP-запросы в обработке")
+
+AUTH_LATENCY = Histogram(
+    "auth_check_duration_seconds",
+    "Время проверки доступа",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# level: local - кэш первого уровня в памяти процесса, redis - Redis.
+# result: hit, miss или stale (запись старше мягкого срока).
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Обращения к кэшу ответов", ["index", "level", "result"])
+CACHE_READ_BYTES = Counter("cache_read_bytes_total", "Объем записей, прочитанных из Redis", ["index"])
+CACHE_WRITTEN_BYTES = Counter("cache_written_bytes_total", "Объем записей, сохраненных в Redis", ["index"])
+
+ELASTIC_LATENCY = Histogram(
+    "elastic_request_duration_seconds",
+    "Время запроса к Elasticsearch с точки зрения сервиса",
+    ["method"],
+    buckets=LATENCY_BUCKETS,
+)
+ELASTIC_TOOK = Histogram(
+    "elastic_took_seconds",
+    "Время выполнения запроса внутри Elasticsearch (поле took ответа)",
+    ["method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+BREAKER_STATE = Enum(
+    "circuit_breaker_state",
+    "Состояние предохранителя",
+    ["breaker"],
+    states=["closed", "open", "half_open"],
+)
+
+
+class BreakerMetricsListener(CircuitBreakerListener):
+    """
+    Отражает состояние предохранителя в метрике `circuit_breaker_state`.
+    """
+
+    def __init__(self, name: str):
+        self.metric = BREAKER_STATE.labels(name)
+        self.metric.state("closed")
+
+    def state_change(self, breaker, old, new):
+        self.metric.state(new.state.name.lower())
+
+
+class LocalCacheCollector:
+    """
+    Счетчики кэшей в памяти процесса (`LocalCache.stats`), читаются при каждом
+    запросе метрик.
+    """
+
+    def __init__(self, caches: dict):
+        """
+        :param caches: название кэша для метки `cache` -> кэш.
+        """
+        self.caches = caches
+
+    def collect(self):
+        families = {
+            "hits": CounterMetricFamily("local_cache_hits", "Попадания в кэш в памяти процесса", labels=["cache"]),
+            "misses": CounterMetricFamily("local_cache_misses", "Промахи кэша в памяти процесса", labels=["cache"]),
+            "evictions": CounterMetricFamily(
+                "local_cache_evictions", "Записи, вытесненные из кэша в памяти процесса", labels=["cache"]
+            ),
+            "entries": GaugeMetricFamily("local_cache_entries", "Записи в кэше в памяти процесса", labels=["cache"]),
+            "bytes": GaugeMetricFamily("local_cache_bytes", "Объем кэша в памяти процесса", labels=["cache"]),
+        }
+        for name, cache in self.caches.items():
+            for stat, value in cache.stats().items():
+                families[stat].add_metric([name], value)
+        yield from families.values()
+
+
+def route_path(scope: Scope) -> str:
+    """
+    Шаблон пути обработчика, выбранного маршрутизатором для запроса.
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNKNOWN_ROUTE
+    return _route_paths(scope["app"]).get(endpoint, UNKNOWN_ROUTE)
+
+
+@lru_cache()
+def _route_paths(app: ASGIApp) -> dict:
+    return {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Запускает в отдельном потоке HTTP-сервер, отдающий метрики по любому пути.
+
+    :param port: порт сервера; 0 - не запускать.
+    """
+    if port:
+        start_http_server(port)
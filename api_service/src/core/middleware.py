@@ -0,0 +1,152 @@
+"""
+ASGI middleware приложения.
+
+Middleware написаны на чистом ASGI, а не через `@app.middleware("http")`:
+`BaseHTTPMiddleware` пропускает тело ответа через неограниченную очередь,
+и потоковые ответы (например, выгрузка каталога) целиком накапливались бы
+в памяти, если клиент читает медленнее, чем мы отдаем.
+"""
+import time
+from http import HTTPStatus
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core import auth, context, metrics
+from db import redis
+
+
+class AuthMiddleware:
+    """
+    Пропускает к API только пользователей с действительным токеном и ролью.
+    Роли пользователя доступны обработчикам через `context.user_roles`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status, roles = await auth.authorize(redis.redis, Headers(scope=scope))
+        metrics.AUTH_LATENCY.labels(int(status)).observe(time.perf_counter() - started)
+        if status == HTTPStatus.OK:
+            token = context.user_roles.set(roles)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                context.user_roles.reset(token)
+            return
+
+        if status == HTTPStatus.FORBIDDEN:
+            response = Response(content="Not allowed", status_code=status)
+        else:
+            response = Response(content="Anonymous user", status_code=status)  # будем возвращать фильмы для анонимных юзеров
+        await response(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Учитывает в метриках время обработки запросов и число запросов в обработке.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+            metrics.REQUEST_LATENCY.labels(scope["method"], metrics.route_path(scope), status).observe(
+                time.perf_counter() - started
+            )
+
+
+class ResponseHeadersMiddleware:
+    """
+    Добавляет к ответу заголовки, выставленные через `context.add_response_header`.
+
+    Если успешный ответ построен из одной записи кэша (`context.add_cache_validator`),
+    добавляет `ETag` с ее хэшем и `Cache-Control: private` со сроком ее свежести.
+    На запрос с совпадающим `If-None-Match` отвечает `304 Not Modified` без тела.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {}
+        validators = []
+        headers_token = context.response_headers.set(headers)
+        validators_token = context.cache_validators.set(validators)
+        not_modified = False
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal not_modified
+
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers[name] = value
+
+                etags = {etag for etag, _ in validators}
+                if message["status"] == HTTPStatus.OK and len(etags) == 1:
+                    etag = f'"{etags.pop()}"'
+                    response_headers["ETag"] = etag
+                    if "cache-control" not in response_headers:
+                        max_age = min(max_age for _, max_age in validators)
+                        # Ответы доступны только авторизованным пользователям,
+                        # поэтому хранить их может только браузер, но не общие прокси.
+                        response_headers["Cache-Control"] = f"private, max-age={max_age}"
+                    not_modified = is_not_modified(Headers(scope=scope), etag)
+
+                if not_modified:
+                    message["status"] = HTTPStatus.NOT_MODIFIED.value
+                    del response_headers["content-length"]
+                    del response_headers["content-type"]
+
+            elif not_modified:
+                # Тело ответа не отправляем, но дожидаемся его конца.
+                if message.get("more_body", False):
+                    return
+                message = {"type": "http.response.body", "body": b""}
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            context.cache_validators.reset(validators_token)
+            context.response_headers.reset(headers_token)
+
+
+def is_not_modified(request_headers: Headers, etag: str) -> bool:
+    if_none_match = request_headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    # Слабое сравнение (RFC 7232, 3.2): префикс W/ не учитывается.
+    tags = {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
@@ -1,7 +1,131 @@
+import hashlib
+import logging
+import time
+from datetime import timedelta
+from typing import Callable
+
+import elasticsearch
+import orjson
+from aiobreaker import CircuitBreaker
 from elasticsearch import AsyncElasticsearch
 
+from core import config, context, metrics
+from db.fake_elastic import FakeElasticsearch
+
 es: AsyncElasticsearch = None
 
+# Медленные запросы и результаты профилирования пишутся в отдельные журналы,
+# чтобы их можно было направить в отдельный файл или систему сбора логов.
+slow_log = logging.getLogger("elastic.slow")
+profile_log = logging.getLogger("elastic.profile")
+
+# Размыкается после серии сбоев Elasticsearch. Ответы «не найдено» и ошибки
+# в запросе сбоями не считаются.
+es_breaker = CircuitBreaker(
+    fail_max=5,
+    timeout_duration=timedelta(seconds=30),
+    exclude=[elasticsearch.NotFoundError, elasticsearch.RequestError],
+    listeners=[metrics.BreakerMetricsListener("elastic")],
+)
+
+
+async def call_elastic(method: Callable, **kwargs):
+    """
+    Вызывает метод клиента Elasticsearch через предохранитель
+    и учитывает время запроса в метриках.
+
+    Запросы дольше `SLOW_QUERY_THRESHOLD_MS` пишутся в журнал `elastic.slow`.
+    Если для запроса включено профилирование (`context.profiling`), поиск
+    выполняется с `"profile": true`: разбивка времени добавляется к ответу
+    в заголовке `Server-Timing`, а полный профиль пишется в журнал `elastic.profile`.
+    """
+    name = getattr(method, "__name__", "unknown")
+    params = kwargs
+    if context.profiling.get() and name == "search" and "body" in kwargs:
+        params = {**kwargs, "body": {**kwargs["body"], "profile": True}}
+
+    started = time.perf_counter()
+    try:
+        response = await es_breaker.call_async(method, **params)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.ELASTIC_LATENCY.labels(name).observe(elapsed)
+    if not isinstance(response, dict):
+        return response
+
+    if "took" in response:
+        metrics.ELASTIC_TOOK.labels(name).observe(response["took"] / 1000)
+    if elapsed * 1000 >= config.SLOW_QUERY_THRESHOLD_MS:
+        log_slow_query(name, kwargs, response, elapsed)
+    if "profile" in response:
+        report_profile(name, kwargs, response)
+    return response
+
+
+def body_hash(body) -> str:
+    """
+    Хэш тела запроса, чтобы группировать одинаковые запросы в журнале.
+    """
+    return hashlib.blake2b(orjson.dumps(body, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+
+
+def log_slow_query(name: str, kwargs: dict, response: dict, elapsed: float) -> None:
+    body = kwargs.get("body")
+    total = response.get("hits", {}).get("total")
+    hits = total["value"] if isinstance(total, dict) else total
+    slow_log.warning(
+        "Slow %s on %s: %.0f ms, took %s ms, %s hits, cache key %r, body %s %s",
+        name,
+        kwargs.get("index", "-"),
+        elapsed * 1000,
+        response.get("took"),
+        hits,
+        context.cache_key.get(),
+        body_hash(body),
+        orjson.dumps(body).decode(),
+    )
+
+
+def report_profile(name: str, kwargs: dict, response: dict) -> None:
+    """
+    Добавляет к ответу заголовок `Server-Timing` с временем запроса в Elasticsearch
+    и суммарным по шардам временем этапов: поиска, сбора результатов и агрегаций.
+    """
+    query = collect = aggregations = 0
+    for shard in response["profile"]["shards"]:
+        for search in shard.get("searches", []):
+            query += sum(item["time_in_nanos"] for item in search.get("query", []))
+            collect += sum(item["time_in_nanos"] for item in search.get("collector", []))
+        aggregations += sum(item["time_in_nanos"] for item in shard.get("aggregations", []))
+
+    description = f"{name} {kwargs['index']}" if "index" in kwargs else name
+    context.append_response_header(
+        "Server-Timing",
+        f'es;desc="{description}";dur={response.get("took", 0)}, '
+        f"es-query;dur={query / 1e6:.3f}, es-collect;dur={collect / 1e6:.3f}, "
+        f"es-aggs;dur={aggregations / 1e6:.3f}",
+    )
+    profile_log.info(
+        "Profile of %s on %s, cache key %r, body %s: %s",
+        name,
+        kwargs.get("index", "-"),
+        context.cache_key.get(),
+        body_hash(kwargs.get("body")),
+        orjson.dumps(response["profile"]).decode(),
+    )
+
+
+def create_elastic() -> AsyncElasticsearch:
+    """
+    Клиент Elasticsearch или, при `ELASTIC_BACKEND=fake`, Elasticsearch в памяти
+    процесса с документами из `FAKE_ELASTIC_DATA_DIR`.
+    """
+    if config.ELASTIC_BACKEND == "fake":
+        return FakeElasticsearch.from_directory(
+            config.FAKE_ELASTIC_DATA_DIR, latency=config.FAKE_ELASTIC_LATENCY_MS / 1000
+        )
+    return AsyncElasticsearch(hosts=[f"{config.ELASTIC_HOST}:{config.ELASTIC_PORT}"])
+
 
 async def get_elastic() -> AsyncElasticsearch:
     return es
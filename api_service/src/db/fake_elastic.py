@@ -0,0 +1,317 @@
+"""
+Elasticsearch в памяти процесса для тестов и бенчмарков.
+
+Реализует подмножество API `AsyncElasticsearch`, которое использует сервис:
+`get`, `mget`, `search` и point-in-time. Поиск понимает запросы, которые
+строит API: `match_all`, `ids`, `term`/`terms`, `range`, `bool` (`must`,
+`filter`), `match` и `multi_match` (совпадение по словам без анализаторов),
+сортировку, `from`/`size`, `search_after`, `_source` и агрегации
+`terms`/`histogram`. Подполе `keyword` совпадает с самим полем.
+
+Каждый запрос отвечает с задержкой `latency`, чтобы поведение кэша и
+объединения запросов можно было проверять при заданном времени ответа
+Elasticsearch.
+"""
+import asyncio
+import json
+import math
+import re
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Union
+
+import elasticsearch
+
+
+class FakeIndex:
+    """
+    Документы одного индекса и построенные по требованию обратные индексы полей.
+    """
+
+    def __init__(self, docs: list[dict]):
+        self.docs = {doc["id"]: doc for doc in docs}
+        self._terms: dict[str, dict[str, set[str]]] = {}
+        self._words: dict[str, dict[str, set[str]]] = {}
+        self._orders: dict[str, list[str]] = {}
+
+    def values(self, id: str, field: str) -> list:
+        return field_values(self.docs[id], field)
+
+    def terms(self, field: str) -> dict[str, set[str]]:
+        """
+        Значение поля -> id документов (для `term`).
+        """
+        if field not in self._terms:
+            self._terms[field] = defaultdict(set)
+            for id in self.docs:
+                for value in self.values(id, field):
+                    self._terms[field][str(value)].add(id)
+        return self._terms[field]
+
+    def words(self, field: str) -> dict[str, set[str]]:
+        """
+        Слово -> id документов (для `match` и `multi_match`).
+        """
+        if field not in self._words:
+            self._words[field] = defaultdict(set)
+            for id in self.docs:
+                for value in self.values(id, field):
+                    for word in words(value):
+                        self._words[field][word].add(id)
+        return self._words[field]
+
+    def order(self, sort: list) -> list[str]:
+        """
+        id всех документов в порядке сортировки без `_score`.
+        """
+        key = json.dumps(sort, sort_keys=True)
+        if key not in self._orders:
+            self._orders[key] = sorted(self.docs, key=lambda id: sort_key(sort, self.sort_values(sort, id, 0)))
+        return self._orders[key]
+
+    def sort_values(self, sort: list, id: str, score: float) -> list:
+        values = []
+        for item in sort:
+            (field, _), = item.items()
+            if field == "_score":
+                values.append(score)
+            else:
+                found = self.values(id, field)
+                values.append(found[0] if found else None)
+        return values
+
+    def match(self, query: dict) -> dict[str, float]:
+        """
+        :return: id подходящих документов и их релевантность.
+        """
+        (kind, params), = query.items()
+        if kind == "match_all":
+            return dict.fromkeys(self.docs, 1.0)
+        if kind == "ids":
+            return {id: 1.0 for id in params["values"] if id in self.docs}
+        if kind in ("term", "terms"):
+            (field, expected), = params.items()
+            terms = self.terms(field)
+            return {id: 1.0 for value in as_list(expected) for id in terms.get(str(value), ())}
+        if kind == "range":
+            (field, bounds), = params.items()
+            ops = {"gte": float.__ge__, "gt": float.__gt__, "lte": float.__le__, "lt": float.__lt__}
+            return {
+                id: 1.0
+                for id in self.docs
+                if any(
+                    all(ops[op](float(value), float(bound)) for op, bound in bounds.items())
+                    for value in self.values(id, field)
+                )
+            }
+        if kind in ("match", "multi_match"):
+            if kind == "match":
+                (field, text), = params.items()
+                fields, text = [field], text["query"] if isinstance(text, dict) else text
+            else:
+                fields, text = params["fields"], params["query"]
+            # Релевантность - число слов запроса, найденных в документе.
+            scores = Counter()
+            for word in words(text):
+                scores.update(set().union(*(self.words(field).get(word, ()) for field in fields)))
+            return {id: float(score) for id, score in scores.items()}
+        if kind == "bool":
+            result = None
+            for clause in ("must", "filter"):
+                for subquery in as_list(params.get(clause, [])):
+                    found = self.match(subquery)
+                    if result is None:
+                        result = {id: 1.0 for id in found}
+                    result = {id: score for id, score in result.items() if id in found}
+                    if clause == "must":
+                        result = {id: score + found[id] for id, score in result.items()}
+            return dict.fromkeys(self.docs, 1.0) if result is None else result
+        raise ValueError(f"Unsupported query {kind!r}")
+
+    def aggregate(self, aggregation: dict, found: dict[str, float]) -> dict:
+        (kind, params), = aggregation.items()
+        if kind == "terms":
+            counts = Counter(value for id in found for value in set(map(str, self.values(id, params["field"]))))
+            buckets = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:params.get("size", 10)]
+            return {"buckets": [{"key": key, "doc_count": count} for key, count in buckets]}
+        if kind == "histogram":
+            interval = params["interval"]
+            counts = Counter(
+                math.floor(float(value) / interval) * interval
+                for id in found
+                for value in self.values(id, params["field"])
+            )
+            keys = set(counts)
+            if params.get("min_doc_count", 0) == 0:
+                # Пустые интервалы между найденными значениями и границами `extended_bounds`
+                bounds = [math.floor(bound / interval) * interval for bound in params.get("extended_bounds", {}).values()]
+                if keys or bounds:
+                    low, high = min([*keys, *bounds]), max([*keys, *bounds])
+                    keys = {low + step * interval for step in range(round((high - low) / interval) + 1)}
+            return {"buckets": [{"key": key, "doc_count": counts.get(key, 0)} for key in sorted(keys)]}
+        raise ValueError(f"Unsupported aggregation {kind!r}")
+
+
+class FakeElasticsearch:
+    """
+    Замена `AsyncElasticsearch`. Считает обращения по методам.
+    """
+
+    def __init__(self, indices: dict[str, list[dict]], latency: float = 0):
+        """
+        :param indices: документы индексов: имя индекса -> список документов с полем `id`.
+        :param latency: задержка ответа на запрос в секундах.
+        """
+        self.indices = {name: FakeIndex(docs) for name, docs in indices.items()}
+        self.latency = latency
+        self.calls = Counter()
+        self.pits: dict[str, str] = {}
+
+    @classmethod
+    def from_directory(cls, path: Union[str, Path], latency: float = 0) -> "FakeElasticsearch":
+        """
+        Индексы из файлов `<index>.json` со списками документов,
+        как в tests/functional/testdata/elastic.
+        """
+        files = Path(path).glob("*.json") if path else ()
+        return cls(
+            {file.stem: json.loads(file.read_text()) for file in files if not file.stem.endswith("_mapping")},
+            latency,
+        )
+
+    def _index(self, name: str) -> FakeIndex:
+        if name not in self.indices:
+            raise elasticsearch.NotFoundError(404, "index_not_found_exception", {"index": name})
+        return self.indices[name]
+
+    async def _respond(self, method: str, response: dict) -> dict:
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {"took": int(self.latency * 1000), **response}
+
+    async def get(self, index, id, **kwargs):
+        docs = self._index(index).docs
+        if id not in docs:
+            await self._respond("get", {})
+            raise elasticsearch.NotFoundError(404, "not_found", {"_index": index, "_id": id, "found": False})
+        return await self._respond("get", {**hit(index, docs[id], kwargs.get("_source")), "found": True})
+
+    async def mget(self, index, body, **kwargs):
+        docs = self._index(index).docs
+        return await self._respond(
+            "mget",
+            {
+                "docs": [
+                    {**hit(index, docs[id]), "found": True} if id in docs else {"_index": index, "_id": id, "found": False}
+                    for id in body["ids"]
+                ]
+            },
+        )
+
+    async def open_point_in_time(self, index, keep_alive, **kwargs):
+        self._index(index)
+        pit_id = uuid.uuid4().hex
+        self.pits[pit_id] = index
+        return await self._respond("open_point_in_time", {"id": pit_id})
+
+    async def close_point_in_time(self, body, **kwargs):
+        self.pits.pop(body["id"], None)
+        return await self._respond("close_point_in_time", {"succeeded": True})
+
+    async def search(self, body, index=None, **kwargs):
+        if "pit" in body:
+            if body["pit"]["id"] not in self.pits:
+                raise elasticsearch.NotFoundError(404, "search_context_missing_exception", {})
+            index = self.pits[body["pit"]["id"]]
+        fixture = self._index(index)
+        try:
+            found = fixture.match(body.get("query", {"match_all": {}}))
+            aggregations = {name: fixture.aggregate(agg, found) for name, agg in body.get("aggs", {}).items()}
+        except ValueError as e:
+            raise elasticsearch.RequestError(400, "parsing_exception", {"error": str(e)})
+
+        sort = as_list(body.get("sort", [{"_score": "desc"}]))
+        if any("_score" in item for item in sort):
+            ids = sorted(found, key=lambda id: sort_key(sort, fixture.sort_values(sort, id, found[id])))
+        else:
+            ids = [id for id in fixture.order(sort) if id in found]
+
+        if "search_after" in body:
+            after = sort_key(sort, body["search_after"])
+            ids = [id for id in ids if sort_key(sort, fixture.sort_values(sort, id, found[id])) > after]
+        start = body.get("from", 0)
+        size = body.get("size", 10)
+
+        response = {
+            "hits": {
+                "total": {"value": len(found), "relation": "eq"},
+                "hits": [
+                    {
+                        **hit(index, fixture.docs[id], body.get("_source")),
+                        "_score": found[id],
+                        "sort": fixture.sort_values(sort, id, found[id]),
+                    }
+                    for id in ids[start:start + size]
+                ],
+            }
+        }
+        if aggregations:
+            response["aggregations"] = aggregations
+        if "pit" in body:
+            response["pit_id"] = body["pit"]["id"]
+        return await self._respond("search", response)
+
+    async def close(self) -> None:
+        pass
+
+
+def hit(index: str, doc: dict, source: Union[list, str, None] = None) -> dict:
+    id = doc.get("id")
+    if source is not None:
+        fields = source.split(",") if isinstance(source, str) else source
+        doc = {field: doc[field] for field in fields if field in doc}
+    return {"_index": index, "_id": id, "_source": doc}
+
+
+def field_values(doc: dict, field: str) -> list:
+    """
+    Значения поля документа по пути через точку, как их видит Elasticsearch:
+    массивы объектов раскрываются, подполе `keyword` совпадает с полем.
+    """
+    values = [doc]
+    for name in re.sub(r"\.keyword$", "", field).split("."):
+        nested = []
+        for value in values:
+            value = value.get(name) if isinstance(value, dict) else None
+            nested.extend(value if isinstance(value, list) else [value])
+        values = nested
+    return [value for value in values if value is not None]
+
+
+def words(text) -> set[str]:
+    return set(re.findall(r"\w+", str(text).lower()))
+
+
+def as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def sort_key(sort: list, values: list) -> tuple:
+    """
+    Ключ для сортировки по возрастанию; отсутствующие значения - в конце.
+    """
+    key = []
+    for item, value in zip(sort, values):
+        (field, order), = item.items()
+        order = order["order"] if isinstance(order, dict) else order
+        if value is None:
+            key.append((1, 0))
+        elif isinstance(value, (int, float)):
+            key.append((0, -value if order == "desc" else value))
+        else:
+            # Строки по убыванию сравниваются через инвертированные коды символов.
+            # Завершающий 0 больше любого кода, поэтому "abc" идет раньше своего префикса "ab".
+            key.append((0, (*(-ord(char) for char in value), 0) if order == "desc" else value))
+    return tuple(key)
@@ -0,0 +1,191 @@
+"""
+Redis в памяти процесса для тестов и бенчмарков.
+
+Реализует подмножество API `aioredis.Redis`, которое использует сервис:
+строки и множества со временем жизни, `MGET`, скрипт освобождения блокировки,
+конвейер и pub/sub. Каждая команда (и каждый конвейер целиком) отвечает
+с задержкой `latency`, чтобы поведение кэша можно было проверять
+при заданном времени ответа Redis.
+"""
+import asyncio
+import copy
+import time
+from typing import Any, Optional
+
+from db.redis_scripts import RELEASE_SCRIPT
+
+
+def to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+def decode(value, encoding: Optional[str]):
+    if encoding is None or value is None:
+        return value
+    return value.decode(encoding)
+
+
+class FakeChannel:
+    def __init__(self, name: str):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def iter(self, *, encoding: Optional[str] = None, decoder=None):
+        while True:
+            message = decode(await self.queue.get(), encoding)
+            yield decoder(message) if decoder else message
+
+
+class FakeRedis:
+    """
+    Замена `aioredis.Redis`.
+    """
+
+    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"
+    SET_IF_EXIST = "SET_IF_EXIST"
+
+    def __init__(self, latency: float = 0):
+        """
+        :param latency: задержка ответа на команду в секундах.
+        """
+        self.latency = latency
+        self.data: dict[str, Any] = {}
+        self.expires: dict[str, float] = {}
+        self.channels: dict[str, list[FakeChannel]] = {}
+        self.commands = 0
+
+    async def _round_trip(self) -> None:
+        self.commands += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _get(self, key: str):
+        expire_at = self.expires.get(key)
+        if expire_at is not None and expire_at <= time.monotonic():
+            self._delete(key)
+        return self.data.get(key)
+
+    def _set(self, key: str, value, expire: float = 0) -> None:
+        self.data[key] = value
+        if expire:
+            self.expires[key] = time.monotonic() + expire
+        else:
+            self.expires.pop(key, None)
+
+    def _delete(self, key: str) -> int:
+        self.expires.pop(key, None)
+        return int(self.data.pop(key, None) is not None)
+
+    async def get(self, key: str, *, encoding: Optional[str] = None):
+        await self._round_trip()
+        return decode(self._get(key), encoding)
+
+    async def mget(self, key: str, *keys: str, encoding: Optional[str] = None) -> list:
+        await self._round_trip()
+        return [decode(self._get(key), encoding) for key in (key, *keys)]
+
+    async def set(self, key: str, value, *, expire: float = 0, pexpire: float = 0, exist: Optional[str] = None):
+        await self._round_trip()
+        exists = self._get(key) is not None
+        if exist == self.SET_IF_NOT_EXIST and exists or exist == self.SET_IF_EXIST and not exists:
+            return None
+        self._set(key, to_bytes(value), expire or pexpire / 1000)
+        return True
+
+    async def incr(self, key: str) -> int:
+        await self._round_trip()
+        value = int(self._get(key) or 0) + 1
+        self.data[key] = to_bytes(value)
+        return value
+
+    async def delete(self, key: str, *keys: str) -> int:
+        await self._round_trip()
+        return sum(self._delete(key) for key in (key, *keys) if self._get(key) is not None)
+
+    async def expire(self, key: str, timeout: float) -> bool:
+        await self._round_trip()
+        if self._get(key) is None:
+            return False
+        self.expires[key] = time.monotonic() + timeout
+        return True
+
+    async def sadd(self, key: str, member, *members) -> int:
+        await self._round_trip()
+        values = self._get(key)
+        if values is None:
+            values = self.data[key] = set()
+        added = {to_bytes(value) for value in (member, *members)} - values
+        values.update(added)
+        return len(added)
+
+    async def smembers(self, key: str, *, encoding: Optional[str] = None) -> set:
+        await self._round_trip()
+        return {decode(value, encoding) for value in self._get(key) or ()}
+
+    async def eval(self, script: str, keys: list = (), args: list = ()):
+        """
+        Выполняет один из скриптов `db.redis_scripts` его реализацией на Python.
+        """
+        await self._round_trip()
+        scripts = {RELEASE_SCRIPT: self._release}
+        if script not in scripts:
+            raise ValueError(f"Unsupported script for FakeRedis: {script.strip()!r}")
+        return scripts[script](keys, args)
+
+    def _release(self, keys: list, args: list) -> int:
+        if self._get(keys[0]) == to_bytes(args[0]):
+            return self._delete(keys[0])
+        return 0
+
+    async def publish(self, channel: str, message) -> int:
+        await self._round_trip()
+        subscribers = self.channels.get(channel, [])
+        for subscriber in subscribers:
+            subscriber.queue.put_nowait(to_bytes(message))
+        return len(subscribers)
+
+    async def subscribe(self, channel: str, *channels: str) -> list[FakeChannel]:
+        await self._round_trip()
+        subscribed = []
+        for name in (channel, *channels):
+            subscribed.append(FakeChannel(name))
+            self.channels.setdefault(name, []).append(subscribed[-1])
+        return subscribed
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def close(self) -> None:
+        pass
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+class FakePipeline:
+    """
+    Команды выполняются при `execute` за одну задержку, как один обмен с Redis.
+    """
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            future = asyncio.get_running_loop().create_future()
+            self.commands.append((name, args, kwargs, future))
+            return future
+
+        return command
+
+    async def execute(self) -> list:
+        await self.redis._round_trip()
+        # Те же данные без задержки на каждую команду
+        redis = copy.copy(self.redis)
+        redis.latency = 0
+        for name, args, kwargs, future in self.commands:
+            future.set_result(await getattr(redis, name)(*args, **kwargs))
+        return [future.result() for *_, future in self.commands]
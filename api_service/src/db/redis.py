@@ -1,7 +1,20 @@
+import aioredis
 from aioredis import Redis
 
+from core import config
+from db.fake_redis import FakeRedis
+
 redis: Redis = None
 
 
+async def create_redis() -> Redis:
+    """
+    Пул соединений с Redis или, при `REDIS_BACKEND=fake`, Redis в памяти процесса.
+    """
+    if config.REDIS_BACKEND == "fake":
+        return FakeRedis(latency=config.FAKE_REDIS_LATENCY_MS / 1000)
+    return await aioredis.create_redis_pool((config.REDIS_HOST, config.REDIS_PORT), minsize=10, maxsize=20)
+
+
 async def get_redis() -> Redis:
     return redis
@@ -0,0 +1,11 @@
+"""
+Lua-скрипты, которые сервис выполняет в Redis.
+"""
+
+# Удаляет блокировку, только если она все еще принадлежит владельцу.
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
@@ -1,18 +1,19 @@
+import asyncio
 import logging
-from datetime import timedelta
 
-import aioredis
 import uvicorn
-from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
-from httpx import AsyncClient, RequestError
-from aiobreaker import CircuitBreaker, CircuitBreakerListener
+from prometheus_client import REGISTRY
 
-from api.v1 import filmwork, genre, person
-from core import config
+from api.v1 import filmwork, genre, person, suggest
+from core import auth, config, metrics
 from core.logger import LOGGING
+from core.middleware import AuthMiddleware, MetricsMiddleware, ResponseHeadersMiddleware
 from db import elastic, redis
+from services import invalidation
+from services.base import local_cache
+from services.genre import genre_catalog
 
 app = FastAPI(
     title=config.PROJECT_NAME,
@@ -21,58 +22,44 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 
+REGISTRY.register(metrics.LocalCacheCollector({"auth_decisions": auth.decisions, "responses": local_cache}))
+
+# Фоновые задачи, которые живут все время работы приложения
+background_tasks: list[asyncio.Task] = []
+
 
 @app.on_event("startup")
 async def startup():
-    redis.redis = await aioredis.create_redis_pool(
-        (config.REDIS_HOST, config.REDIS_PORT), minsize=10, maxsize=20
-    )
-    elastic.es = AsyncElasticsearch(
-        hosts=[f"{config.ELASTIC_HOST}:{config.ELASTIC_PORT}"]
-    )
+    metrics.start_metrics_server(config.METRICS_PORT)
+    redis.redis = await redis.create_redis()
+    elastic.es = elastic.create_elastic()
+    auth.http_client = auth.create_http_client()
+    await auth.load_public_key()
+    await genre_catalog.refresh(elastic.es)
+    background_tasks.append(asyncio.create_task(invalidation.listen(redis.redis)))
+    background_tasks.append(asyncio.create_task(genre_catalog.run(elastic.es)))
 
 
 @app.on_event("shutdown")
 async def shutdown():
-    await redis.redis.close()
+    for task in background_tasks:
+        task.cancel()
+    redis.redis.close()
+    await redis.redis.wait_closed()
     await elastic.es.close()
+    await auth.http_client.aclose()
 
 
 app.include_router(filmwork.router, prefix="/api/v1/film", tags=["film"])
 app.include_router(genre.router, prefix="/api/v1/genre", tags=["genre"])
 app.include_router(person.router, prefix="/api/v1/person", tags=["person"])
-
-auth_breaker = CircuitBreaker(fail_max=5)
-
-
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    headers = request.headers
-    base_url = "http://" + config.AUTH_URL
-    try:
-        auth_answer = await send_circuit_request(f"{base_url}/auth/v1/authorize", headers=dict(headers))
-    except RequestError:
-        return Response(content="Anonymous user", status_code=401)  # будем возвращать фильмы для анонимных юзеров
-    if auth_answer.status_code == 200:
-        data = auth_answer.json()
-        if data["roles"]:  # здесь должна быть проверка роли, если просто юзер, то одни данные, если подписчик - другие
-            response = await call_next(request)
-            return response
-        return Response(content="Not allowed", status_code=403)
-    return Response(content="Anonymous user", status_code=401)  # будем возвращать фильмы для анонимных юзеров
-
-
-class LogListener(CircuitBreakerListener):
-    def state_change(self, breaker, old, new):
-        logging.info(f"{old.state} -> {new.state}")
+app.include_router(suggest.router, prefix="/api/v1/suggest", tags=["suggest"])
 
 
-@auth_breaker
-async def send_circuit_request(url: str, headers: dict):
-    async with AsyncClient() as client:
-        answer = await client.get(url, headers=headers)
-        logging.info(answer)
-        return answer
+app.add_middleware(AuthMiddleware)
+# Добавленный последним middleware выполняется первым
+app.add_middleware(ResponseHeadersMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 if __name__ == "__main__":
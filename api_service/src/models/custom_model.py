@@ -1,5 +1,10 @@
+import copy
+from functools import lru_cache
+from typing import Any, Callable, Optional, Type, get_type_hints
+
 import orjson
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
 
 
 def orjson_dumps(v, *, default):
@@ -10,3 +15,93 @@ class CustomModel(BaseModel):
     class Config:
         json_loads = orjson.loads
         json_dumps = orjson_dumps
+
+
+@lru_cache()
+def projection(model: Type[CustomModel], fields: tuple[str, ...]) -> Type[CustomModel]:
+    """
+    Модель с подмножеством полей `model`: типы, значения по умолчанию
+    и валидация полей те же.
+    """
+    hints = get_type_hints(model)
+    return create_model(
+        f"{model.__name__}Projection",
+        __base__=CustomModel,
+        **{name: (hints[name], model.__fields__[name].field_info) for name in fields},
+    )
+
+
+@lru_cache()
+def optional_fields(model: Type[CustomModel], required: tuple[str, ...] = ("id",)) -> Type[CustomModel]:
+    """
+    Схема ответа с выбором полей (`fields=`): поля, кроме `required`,
+    необязательны, в ответе есть только запрошенные.
+    """
+    hints = get_type_hints(model)
+    return create_model(
+        f"{model.__name__}Fields",
+        __base__=CustomModel,
+        **{
+            name: (hints[name], field.field_info) if name in required else (Optional[hints[name]], None)
+            for name, field in model.__fields__.items()
+        },
+    )
+
+
+Shape = Callable[[dict], dict]
+
+_MISSING = object()
+
+
+@lru_cache()
+def shaper(model: Type[BaseModel]) -> Shape:
+    """
+    Функция, приводящая документ к виду `model(**doc).dict()` без валидации.
+
+    Только для документов, которые записал наш ETL: отсутствующие поля
+    получают значения по умолчанию, лишние отбрасываются, вложенные модели
+    приводятся так же, целые числа в полях `float` становятся дробными.
+    Остальные значения не проверяются и не преобразуются: идентификаторы
+    остаются строками, что для JSON-ответа то же самое.
+    """
+    fields = [
+        (field.name, field.alias, _converter(field), _default(field))
+        for field in model.__fields__.values()
+    ]
+
+    def shape(doc: dict) -> dict:
+        result = {}
+        for name, alias, convert, default in fields:
+            value = doc.get(alias, _MISSING)
+            if value is _MISSING:
+                result[name] = default()
+            elif value is None or convert is None:
+                result[name] = value
+            else:
+                result[name] = convert(value)
+        return result
+
+    return shape
+
+
+def _converter(field: ModelField) -> Optional[Callable[[Any], Any]]:
+    if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+        convert = shaper(field.type_)
+    elif field.type_ is float:
+        convert = float
+    else:
+        return None
+
+    if field.shape == SHAPE_SINGLETON:
+        return convert
+    if field.shape == SHAPE_LIST:
+        return lambda values: [convert(value) for value in values]
+    raise TypeError(f"Unsupported field {field.name!r} of {field.outer_type_}")
+
+
+def _default(field: ModelField) -> Callable[[], Any]:
+    if field.default_factory is not None:
+        return field.default_factory
+    if field.default is None or isinstance(field.default, (str, int, float, bool)):
+        return lambda: field.default
+    return lambda: copy.deepcopy(field.default)
@@ -0,0 +1,25 @@
+from .custom_model import CustomModel
+
+
+class GenreFacet(CustomModel):
+    name: str
+    count: int
+
+
+class RatingFacet(CustomModel):
+    # Границы интервала рейтинга: [from, to)
+    from_: float
+    to: float
+    count: int
+
+    class Config:
+        fields = {"from_": "from"}
+
+
+class Facets(CustomModel):
+    """
+    Число фильмов по жанрам и интервалам IMDB рейтинга.
+    """
+    total: int
+    genres: list[GenreFacet]
+    imdb_rating: list[RatingFacet]
@@ -3,7 +3,7 @@ from typing import Optional
 
 from pydantic import Field
 
-from .custom_model import CustomModel
+from .custom_model import CustomModel, optional_fields
 from .genre import Genre
 
 
@@ -17,3 +17,25 @@ class FilmWork(CustomModel):
     actors: list[str] = Field(default_factory=list)
     directors: list[str] = Field(default_factory=list)
     writers: list[str] = Field(default_factory=list)
+
+
+class FilmWorkShort(CustomModel):
+    """
+    Фильм в списке фильмов участника.
+    """
+    id: uuid.UUID
+    title: str
+    imdb_rating: Optional[float] = None
+
+
+# Фильм в ответе с параметром `fields`
+FilmWorkFields = optional_fields(FilmWork)
+
+
+class FilmWorkPage(CustomModel):
+    """
+    Страница фильмов при выводе по курсору (`cursor=`).
+    На последней странице `cursor` - `null`.
+    """
+    items: list[FilmWorkFields]
+    cursor: Optional[str]
@@ -1,8 +1,9 @@
 import uuid
+from typing import Optional
 
 from pydantic import Field
 
-from .custom_model import CustomModel
+from .custom_model import CustomModel, optional_fields
 
 
 class Person(CustomModel):
@@ -11,3 +12,16 @@ class Person(CustomModel):
     last_name: str
     role: list[str] = Field(default_factory=list)
     film_ids: list[uuid.UUID]
+
+
+# Участник в ответе с параметром `fields`
+PersonFields = optional_fields(Person)
+
+
+class PersonPage(CustomModel):
+    """
+    Страница участников при выводе по курсору (`cursor=`).
+    На последней странице `cursor` - `null`.
+    """
+    items: list[PersonFields]
+    cursor: Optional[str]
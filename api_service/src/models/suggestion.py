@@ -0,0 +1,10 @@
+import uuid
+
+from .custom_model import CustomModel
+
+
+class Suggestion(CustomModel):
+    id: uuid.UUID
+    # film или person
+    type: str
+    name: str
@@ -1,13 +1,107 @@
+import asyncio
 import logging
-from typing import AnyStr, Callable, Optional
+import time
+from http import HTTPStatus
+from typing import Awaitable, Callable, Iterable, Optional, Type
 
 import elasticsearch
 import orjson
+from aiobreaker import CircuitBreakerError
 from aioredis import Redis
 from elasticsearch import AsyncElasticsearch
+from fastapi import HTTPException
 from pydantic import BaseModel
 
-RESPONSE_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+from core import config, metrics
+from core.context import add_cache_validator, add_response_header, cache_key, profiling
+from core.local_cache import LocalCache
+from db.elastic import call_elastic
+from models.custom_model import Shape, projection, shaper
+from .cache import CacheEntry, get_codec
+from .coalescing import RedisLock, SingleFlight
+from .generations import generations, list_generations
+from .pagination import TIEBREAKER_FIELD, check_result_window, decode_cursor, encode_cursor
+
+RESPONSE_CACHE_EXPIRE_IN_SECONDS = config.RESPONSE_CACHE_EXPIRE_IN_SECONDS
+
+# Сколько запись и ссылки на нее живут в Redis
+RESPONSE_CACHE_LIFETIME_IN_SECONDS = (
+    RESPONSE_CACHE_EXPIRE_IN_SECONDS + config.RESPONSE_CACHE_STALE_IF_ERROR_SECONDS
+)
+
+STALE_WARNING = '110 - "Response is Stale"'
+
+# Префикс ключей, под которыми хранятся готовые тела ответов,
+# чтобы они не смешивались с сохраненными ответами Elasticsearch.
+BODY_KEY_PREFIX = "body:"
+
+# Запись кэша о том, что документа нет в индексе.
+# Настоящие тела ответов и ответы Elasticsearch никогда не бывают пустыми.
+MISSING = b""
+
+# Сжатие записей в Redis
+codec = get_codec(config.CACHE_CODEC, config.CACHE_CODEC_LEVEL)
+
+# Кэш первого уровня в памяти процесса перед Redis: те же ключи, значения - `CacheEntry`.
+local_cache = LocalCache(
+    max_entries=config.LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=config.LOCAL_CACHE_MAX_BYTES,
+)
+
+
+# Документы, из которых построена запись кэша: пары (индекс, id документа).
+Refs = Iterable[tuple[str, str]]
+
+# Поля модели, которые нужно вернуть, или None - все поля.
+Fields = Optional[tuple[str, ...]]
+
+# Корутина, возвращающая данные для записи в кэш и документы, из которых они построены.
+Fetch = Callable[[], Awaitable[tuple[bytes, Refs]]]
+
+
+# Начало адресов документов по id в ключах кэша (см. `Service._doc_url`)
+DOC_URL_PREFIX = "doc/"
+
+
+def refs_key(index: str, doc_id: str) -> str:
+    """
+    Ключ множества записей кэша, построенных из документа.
+    """
+    return f"refs:{index}:{doc_id}"
+
+
+def local_ttl(payload: bytes) -> float:
+    """
+    Время жизни записи в кэше первого уровня.
+    """
+    if payload == MISSING:
+        return min(config.LOCAL_CACHE_TTL_SECONDS, config.NEGATIVE_CACHE_TTL_SECONDS)
+    return config.LOCAL_CACHE_TTL_SECONDS
+
+
+def remember(key: str, entry: CacheEntry) -> None:
+    """
+    Сохраняет запись в кэш первого уровня.
+    """
+    local_cache.set(key, entry, local_ttl(entry.payload), size=len(entry.payload))
+
+
+def document_shaper(model: Type[BaseModel]) -> Shape:
+    """
+    Функция, приводящая `_source` документа Elasticsearch к ответу по модели `model`.
+    """
+    if config.VALIDATE_ES_DOCUMENTS:
+        return lambda doc: model(**doc).dict()
+    return shaper(model)
+
+
+def is_elastic_unavailable(error: Exception) -> bool:
+    """
+    Отличает недоступность Elasticsearch от ошибок конкретного запроса.
+    """
+    if isinstance(error, CircuitBreakerError):
+        return True
+    return not isinstance(error, (elasticsearch.NotFoundError, elasticsearch.RequestError))
 
 
 class Service:
@@ -22,17 +116,241 @@ class Service:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self.in_flight = SingleFlight()
+        self._refreshing: set[str] = set()
 
-    async def _get_from_cache(self, url: str) -> Optional[AnyStr]:
-        if response := await self.redis.get(url):
-            logging.info("Got from cache %r", url)
-            return response
+    async def _cache_key(self, url: str, lists: Iterable[str] = ()) -> str:
+        """
+        Ключ кэша для url с учетом текущего поколения индекса.
 
-    async def _put_to_cache(self, url: str, obj) -> None:
-        logging.info("Put to cache %r", url)
-        await self.redis.set(
-            url, orjson.dumps(obj), expire=RESPONSE_CACHE_EXPIRE_IN_SECONDS
-        )
+        Запись документа по id удаляется по ссылкам при изменении документа
+        (см. `services.invalidation`). Остальные записи - страницы списков,
+        поиска и агрегаций - зависят от всех документов индекса: новый фильм
+        или изменение рейтинга меняют страницу, в которой этого фильма еще нет.
+        Поэтому в их ключ входит и поколение списков, которое ETL увеличивает
+        при каждом изменении документов.
+
+        :param lists: индексы, из списков которых строится запись,
+            по умолчанию индекс сервиса.
+        """
+        generation = await generations.get(self.redis, self.es_index)
+        if url.startswith(DOC_URL_PREFIX):
+            return f"{self.es_index}:{generation}:{url}"
+        versions = [str(await list_generations.get(self.redis, index)) for index in lists or [self.es_index]]
+        return f"{self.es_index}:{generation}.{'.'.join(versions)}:{url}"
+
+    async def _get_from_cache(self, key: str) -> Optional[CacheEntry]:
+        entry = None
+        if data := await self.redis.get(key):
+            logging.info("Got from cache %r", key)
+            entry = self._unpack(key, data)
+        self._count_lookup("redis", entry)
+        return entry
+
+    def _unpack(self, key: str, data: bytes) -> Optional[CacheEntry]:
+        metrics.CACHE_READ_BYTES.labels(self.es_index).inc(len(data))
+        try:
+            return CacheEntry.unpack(data)
+        except ValueError as e:
+            # Например, запись сжата кодеком, который не установлен в этом процессе.
+            logging.warning("Can't read cache entry %r: %r", key, e)
+
+    def _count_lookup(self, level: str, entry: Optional[CacheEntry]) -> None:
+        if entry is None:
+            result = "miss"
+        elif entry.is_stale():
+            result = "stale"
+        else:
+            result = "hit"
+        metrics.CACHE_LOOKUPS.labels(self.es_index, level, result).inc()
+
+    async def _put_to_cache(self, key: str, payload: bytes, refs: Refs = ()) -> CacheEntry:
+        """
+        Сохраняет запись в кэш и добавляет ее ключ в обратный индекс
+        документов `refs`, чтобы при изменении документа запись можно было
+        удалить (см. `services.invalidation`).
+
+        Отсутствие документа (`MISSING`) хранится недолго и не отдается
+        после истечения срока.
+        """
+        logging.info("Put to cache %r", key)
+        pipe = self.redis.pipeline()
+        entry = self._add_to_pipeline(pipe, key, payload, refs)
+        await pipe.execute()
+        return entry
+
+    def _add_to_pipeline(self, pipe, key: str, payload: bytes, refs: Refs) -> CacheEntry:
+        if payload == MISSING:
+            ttl = lifetime = config.NEGATIVE_CACHE_TTL_SECONDS
+            entry = CacheEntry.create(payload, soft_ttl=ttl, hard_ttl=ttl)
+        else:
+            lifetime = RESPONSE_CACHE_LIFETIME_IN_SECONDS
+            entry = CacheEntry.create(
+                payload,
+                soft_ttl=config.RESPONSE_CACHE_SOFT_TTL_SECONDS,
+                hard_ttl=RESPONSE_CACHE_EXPIRE_IN_SECONDS,
+            )
+        # Запись хранится дольше жесткого срока, чтобы ее можно было
+        # отдать при недоступности Elasticsearch.
+        data = entry.pack(codec, min_size=config.CACHE_CODEC_MIN_SIZE)
+        metrics.CACHE_WRITTEN_BYTES.labels(self.es_index).inc(len(data))
+        pipe.set(key, data, expire=lifetime)
+        for index, doc_id in refs:
+            ref_key = refs_key(index, doc_id)
+            pipe.sadd(ref_key, key)
+            pipe.expire(ref_key, RESPONSE_CACHE_LIFETIME_IN_SECONDS)
+        return entry
+
+    async def _get_cached(self, key: str, fetch: Fetch) -> bytes:
+        """
+        Возвращает данные из кэша, при их отсутствии получает их вызовом `fetch`
+        и сохраняет в кэш.
+        Перед Redis проверяется кэш первого уровня в памяти процесса.
+
+        Одновременные промахи по одному ключу внутри процесса объединяются:
+        в Redis и Elasticsearch идет только один из них, остальные ждут
+        его результат.
+
+        Запись старше мягкого срока отдается сразу, а обновляется в фоне.
+        Запись старше жесткого срока отдается с заголовком `Warning`,
+        только если Elasticsearch недоступен.
+
+        При профилировании запросов (`?profile=true`) кэш не используется.
+
+        :param key: ключ кэша.
+        :param fetch: корутина, возвращающая данные для сохранения в кэш
+            и документы, из которых они построены.
+        """
+        if profiling.get():
+            # Профилировать нужно запрос к Elasticsearch, а не чтение из кэша.
+            payload, _ = await self._call_fetch(key, fetch)
+            return payload
+
+        stale = False
+        entry = local_cache.get(key)
+        self._count_lookup("local", entry)
+        if entry is None:
+            if config.CACHE_SINGLE_FLIGHT:
+                entry, stale = await self.in_flight.do(key, lambda: self._load(key, fetch))
+            else:
+                entry, stale = await self._load(key, fetch)
+
+        if stale:
+            add_response_header("Warning", STALE_WARNING)
+        else:
+            add_cache_validator(entry.etag, entry.max_age())
+
+        return entry.payload
+
+    async def _load(self, key: str, fetch: Fetch) -> tuple[CacheEntry, bool]:
+        """
+        :return: запись и признак того, что она устарела и отдается из-за
+            недоступности Elasticsearch.
+        """
+        entry = await self._get_from_cache(key)
+
+        if entry is None or entry.is_expired():
+            try:
+                if config.CACHE_LOCK_ENABLED:
+                    return await self._fetch_locked(key, fetch), False
+                return await self._fetch(key, fetch), False
+            except (elasticsearch.TransportError, CircuitBreakerError) as e:
+                if entry is None or not is_elastic_unavailable(e):
+                    raise
+                logging.warning("Elasticsearch is unavailable, serving stale %r: %r", key, e)
+                return entry, True
+
+        if entry.is_stale():
+            self._schedule_refresh(key, fetch)
+
+        remember(key, entry)
+        return entry, False
+
+    async def _fetch(self, key: str, fetch: Fetch) -> CacheEntry:
+        payload, refs = await self._call_fetch(key, fetch)
+        entry = await self._put_to_cache(key, payload, refs)
+        remember(key, entry)
+        return entry
+
+    @staticmethod
+    async def _call_fetch(key: str, fetch: Fetch) -> tuple[bytes, Refs]:
+        # Ключ попадает в журнал медленных запросов к Elasticsearch.
+        token = cache_key.set(key)
+        try:
+            return await fetch()
+        finally:
+            cache_key.reset(token)
+
+    async def _fetch_locked(self, key: str, fetch: Fetch) -> CacheEntry:
+        """
+        Запрашивает данные под блокировкой в Redis, чтобы ключ
+        пересчитывал только один процесс во всем кластере.
+        Остальные процессы ждут появления результата в кэше.
+
+        Ожидание читает запись и блокировку одним `MGET`, минуя
+        `_get_from_cache`, чтобы опросы не учитывались в метриках обращений
+        к кэшу. Если владелец снял блокировку, не сохранив запись (например,
+        из-за ошибки Elasticsearch), ожидание прекращается сразу.
+        """
+        lock = RedisLock(self.redis, f"lock:{key}", config.CACHE_LOCK_TIMEOUT_MS)
+        if await lock.acquire():
+            try:
+                return await self._fetch(key, fetch)
+            finally:
+                await lock.release()
+
+        deadline = time.monotonic() + config.CACHE_LOCK_TIMEOUT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config.CACHE_LOCK_POLL_MS / 1000)
+            data, locked = await self.redis.mget(key, lock.key)
+            entry = self._unpack(key, data) if data else None
+            if entry is not None and not entry.is_expired():
+                remember(key, entry)
+                return entry
+            if locked is None:
+                break
+
+        # Владелец блокировки не успел или не смог: запрашиваем сами.
+        return await self._fetch(key, fetch)
+
+    def _schedule_refresh(self, key: str, fetch: Fetch) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, fetch))
+        task.add_done_callback(lambda _: self._refreshing.discard(key))
+
+    async def _refresh(self, key: str, fetch: Fetch) -> None:
+        """
+        Фоновое обновление устаревшей записи кэша.
+        """
+        lock = RedisLock(self.redis, f"lock:{key}", config.CACHE_LOCK_TIMEOUT_MS)
+        if config.CACHE_LOCK_ENABLED and not await lock.acquire():
+            # Запись уже обновляет другой процесс.
+            return
+        try:
+            await self._fetch(key, fetch)
+        except Exception as e:
+            logging.warning("Can't refresh %r: %r", key, e)
+        finally:
+            await lock.release()
+
+    async def _fetch_from_elastic(
+        self, render: Callable[[dict], bytes], es_method: Callable, **kwargs
+    ) -> tuple[bytes, Refs]:
+        """
+        Запрашивает Elasticsearch и строит из ответа данные для кэша.
+
+        Если документа с запрошенным id нет, возвращает `MISSING` со ссылкой
+        на этот id: когда ETL загрузит документ, запись будет удалена.
+        """
+        try:
+            response = await call_elastic(es_method, **kwargs)
+        except elasticsearch.NotFoundError:
+            if "id" not in kwargs:
+                raise
+            return MISSING, [(kwargs["index"], kwargs["id"])]
+        return render(response), self._refs(response)
 
     async def _get_from_cache_or_elastic(self, url: str, es_method: Callable, **kwargs):
         """
@@ -43,30 +361,280 @@ class Service:
         :param es_method: метод elasticsearch который будет вызван для
             получения результата, если url не найден в кэше.
         :param kwargs: параметры которые будут переданы в es_method.
+        :return: ответ Elasticsearch или None, если документа нет.
         """
-        if response := await self._get_from_cache(url):
-            return orjson.loads(response)
 
-        response = await es_method(**kwargs)
+        async def fetch() -> tuple[bytes, Refs]:
+            return await self._fetch_from_elastic(orjson.dumps, es_method, **kwargs)
 
-        await self._put_to_cache(url, response)
+        data = await self._get_cached(await self._cache_key(url), fetch)
+        return None if data == MISSING else orjson.loads(data)
 
-        return response
+    async def _get_response(
+        self, url: str, render: Callable[[dict], bytes], es_method: Callable, **kwargs
+    ) -> bytes:
+        """
+        Возвращает готовое тело ответа в JSON.
 
-    async def get_by_id(self, url: str, id: str):
-        try:
-            doc = await self._get_from_cache_or_elastic(
-                url, self.elastic.get, index=self.es_index, id=id
-            )
-            return self.model_type(**doc["_source"])
-        except elasticsearch.NotFoundError:
+        В режиме `CACHE_RESPONSE_BODY` кэшируется само тело ответа, и при попадании
+        в кэш модели не строятся. Иначе кэшируется ответ Elasticsearch, а тело
+        строится заново на каждый запрос.
+
+        :param render: функция, строящая тело ответа из ответа Elasticsearch.
+        :return: тело ответа или `MISSING`, если документа нет.
+        """
+        if not config.CACHE_RESPONSE_BODY:
+            response = await self._get_from_cache_or_elastic(url, es_method, **kwargs)
+            return MISSING if response is None else render(response)
+
+        async def fetch() -> tuple[bytes, Refs]:
+            return await self._fetch_from_elastic(render, es_method, **kwargs)
+
+        return await self._get_cached(BODY_KEY_PREFIX + await self._cache_key(url), fetch)
+
+    def _refs(self, response: dict) -> Refs:
+        """
+        Документы, при изменении которых запись удаляется: документ из ответа
+        Elasticsearch на `get`. Страницы поиска перестают использоваться
+        со сменой поколения списков, ссылки на их документы не нужны.
+        """
+        if "hits" in response:
+            return []
+        return [(response["_index"], response["_id"])]
+
+    def _fields(self, fields: Optional[str], default: str = "") -> Fields:
+        """
+        Разбирает параметр `fields`: имена полей модели через запятую.
+        `id` возвращается всегда.
+
+        :param default: значение, если параметр не задан.
+        """
+        names = [name.strip() for name in (fields or default).split(",") if name.strip()]
+        if not names:
             return None
 
-    async def _search(self, url: str, body: dict):
-        response = await self._get_from_cache_or_elastic(
-            url, self.elastic.search, index=self.es_index, body=body
+        unknown = set(names) - set(self.model_type.__fields__)
+        if unknown:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"unknown fields: {', '.join(sorted(unknown))}",
+            )
+        # Порядок полей как в модели, чтобы одна проекция давала один класс модели.
+        names = {"id", *names}
+        return tuple(name for name in self.model_type.__fields__ if name in names)
+
+    def _model(self, fields: Fields) -> type[BaseModel]:
+        return self.model_type if fields is None else projection(self.model_type, fields)
+
+    def _project(self, body: dict, fields: Fields) -> dict:
+        """
+        Ограничивает поля документов, которые отдает Elasticsearch.
+        """
+        if fields is None:
+            return body
+        return {**body, "_source": list(fields)}
+
+    def _render_doc(self, doc: dict) -> bytes:
+        return orjson.dumps(document_shaper(self.model_type)(doc["_source"]))
+
+    def _render_hits(self, response: dict, fields: Fields = None) -> bytes:
+        shape = document_shaper(self._model(fields))
+        return orjson.dumps([shape(doc["_source"]) for doc in response["hits"]["hits"]])
+
+    def _render_page(self, response: dict, page_size: int, fields: Fields = None) -> bytes:
+        """
+        Страница для постраничного вывода по курсору: документы и курсор
+        следующей страницы (`null` на последней странице).
+        """
+        hits = response["hits"]["hits"]
+        cursor = None
+        if hits and len(hits) == page_size:
+            cursor = encode_cursor(hits[-1]["sort"], response.get("pit_id"))
+        shape = document_shaper(self._model(fields))
+        return orjson.dumps({
+            "items": [shape(doc["_source"]) for doc in hits],
+            "cursor": cursor,
+        })
+
+    def _doc_url(self, id: str) -> str:
+        """
+        Адрес документа для ключа кэша. Общий для запросов одного документа
+        и пачки документов, поэтому они используют одни и те же записи.
+        """
+        return f"{DOC_URL_PREFIX}{id}"
+
+    async def _doc_key(self, id: str) -> str:
+        key = await self._cache_key(self._doc_url(id))
+        return BODY_KEY_PREFIX + key if config.CACHE_RESPONSE_BODY else key
+
+    def _doc_body(self, payload: bytes) -> bytes:
+        """
+        Тело ответа из записи кэша документа.
+        """
+        if config.CACHE_RESPONSE_BODY:
+            return payload
+        return self._render_doc(orjson.loads(payload))
+
+    async def get_by_id(self, id: str) -> Optional[bytes]:
+        body = await self._get_response(
+            self._doc_url(id), self._render_doc, self.elastic.get, index=self.es_index, id=id
+        )
+        return None if body == MISSING else body
+
+    async def get_many(self, ids: list[str]) -> bytes:
+        """
+        Возвращает JSON-массив документов в порядке `ids`.
+        Отсутствующие в индексе документы пропускаются.
+
+        Все записи читаются из Redis одним `MGET`, недостающие документы
+        запрашиваются у Elasticsearch одним `mget` и сохраняются в кэш одним
+        конвейером.
+
+        Ответ собирается из нескольких записей, поэтому `ETag` у него нет.
+        """
+        ids = list(dict.fromkeys(ids))
+        keys = {id: await self._doc_key(id) for id in ids}
+        payloads: dict[str, bytes] = {}
+        expired: dict[str, bytes] = {}
+
+        for id, key in keys.items():
+            entry = local_cache.get(key)
+            self._count_lookup("local", entry)
+            if entry is not None:
+                payloads[id] = entry.payload
+
+        missed = [id for id in ids if id not in payloads]
+        if missed:
+            for id, data in zip(missed, await self.redis.mget(*(keys[id] for id in missed))):
+                entry = self._unpack(keys[id], data) if data else None
+                self._count_lookup("redis", entry)
+                if entry is None:
+                    continue
+                if entry.is_expired():
+                    expired[id] = entry.payload
+                    continue
+                if entry.is_stale():
+                    self._schedule_refresh(keys[id], self._doc_fetch(id))
+                payloads[id] = entry.payload
+                remember(keys[id], entry)
+
+        missed = [id for id in ids if id not in payloads]
+        if missed:
+            try:
+                payloads.update(await self._fetch_many(missed, keys))
+            except (elasticsearch.TransportError, CircuitBreakerError) as e:
+                if not expired or not is_elastic_unavailable(e):
+                    raise
+                logging.warning("Elasticsearch is unavailable, serving stale documents: %r", e)
+                payloads.update(expired)
+                add_response_header("Warning", STALE_WARNING)
+
+        return b"[" + b",".join(
+            self._doc_body(payloads[id])
+            for id in ids
+            if payloads.get(id, MISSING) != MISSING
+        ) + b"]"
+
+    async def _fetch_many(self, ids: list[str], keys: dict[str, str]) -> dict[str, bytes]:
+        """
+        Запрашивает документы одним `mget` и сохраняет их в кэш.
+        """
+        response = await call_elastic(
+            self.elastic.mget, index=self.es_index, body={"ids": ids}
         )
-        return [self.model_type(**doc["_source"]) for doc in response["hits"]["hits"]]
+        render = self._render_doc if config.CACHE_RESPONSE_BODY else orjson.dumps
+
+        payloads = {}
+        pipe = self.redis.pipeline()
+        for doc in response["docs"]:
+            id = doc["_id"]
+            payloads[id] = render(doc) if doc.get("found") else MISSING
+            remember(keys[id], self._add_to_pipeline(pipe, keys[id], payloads[id], [(self.es_index, id)]))
+        await pipe.execute()
+        return payloads
+
+    def _doc_fetch(self, id: str) -> Fetch:
+        render = self._render_doc if config.CACHE_RESPONSE_BODY else orjson.dumps
+
+        async def fetch() -> tuple[bytes, Refs]:
+            return await self._fetch_from_elastic(
+                render, self.elastic.get, index=self.es_index, id=id
+            )
+
+        return fetch
+
+    async def _search(
+        self, url: str, body: dict, fields: Fields = None, request_cache: bool = False
+    ) -> bytes:
+        """
+        :param fields: поля документов в ответе, по умолчанию все поля модели.
+        :param request_cache: разрешить Elasticsearch сохранить ответ в кэше
+            запросов шарда. Без этого ответы с документами (`size > 0`) не кэшируются.
+        """
+        params = {"request_cache": True} if request_cache else {}
+
+        def render(response: dict) -> bytes:
+            return self._render_hits(response, fields)
+
+        return await self._get_response(
+            url,
+            render,
+            self.elastic.search,
+            index=self.es_index,
+            body=self._project(body, fields),
+            **params,
+        )
+
+    async def _search_after(
+        self,
+        url: str,
+        query: dict,
+        sort: list,
+        page_size: int,
+        cursor: str,
+        pit: bool = False,
+        fields: Fields = None,
+        request_cache: bool = False,
+    ) -> bytes:
+        """
+        Страница результатов поиска после курсора.
+
+        :param sort: сортировка; для однозначного порядка к ней добавляется `id`.
+        :param cursor: курсор из предыдущего ответа или пустая строка для первой страницы.
+        :param pit: открыть point-in-time, чтобы все страницы строились по одному
+            снимку индекса. Такие страницы не кэшируются: курсор у каждого клиента свой.
+        :param request_cache: см. `_search`.
+        """
+        search_after, pit_id = decode_cursor(cursor)
+        body = self._project({
+            "size": page_size,
+            "query": query,
+            "sort": [*sort, {TIEBREAKER_FIELD: "asc"}],
+        }, fields)
+        if search_after is not None:
+            body["search_after"] = search_after
+
+        def render(response: dict) -> bytes:
+            return self._render_page(response, page_size, fields)
+
+        if not (pit or pit_id):
+            params = {"request_cache": True} if request_cache else {}
+            return await self._get_response(
+                url, render, self.elastic.search, index=self.es_index, body=body, **params
+            )
+
+        try:
+            if pit_id is None:
+                opened = await call_elastic(
+                    self.elastic.open_point_in_time,
+                    index=self.es_index,
+                    keep_alive=config.SEARCH_PIT_KEEP_ALIVE,
+                )
+                pit_id = opened["id"]
+            body["pit"] = {"id": pit_id, "keep_alive": config.SEARCH_PIT_KEEP_ALIVE}
+            return render(await call_elastic(self.elastic.search, body=body))
+        except elasticsearch.NotFoundError:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="cursor has expired")
 
 
 class MultiMatchSearchMixin:
@@ -75,14 +643,32 @@ class MultiMatchSearchMixin:
     """
 
     async def _multi_match_search(
-        self, url: str, query: str, page_number: int, page_size: int, fields: list[str]
+        self,
+        url: str,
+        query: str,
+        page_number: int,
+        page_size: int,
+        fields: list[str],
+        cursor: Optional[str] = None,
+        pit: bool = False,
+        source_fields: Fields = None,
     ):
+        """
+        :param fields: поля, по которым выполняется поиск.
+        :param source_fields: поля документов в ответе.
+        """
         query = {"multi_match": {"query": query, "fields": fields}}
 
+        if cursor is not None:
+            return await self._search_after(
+                url, query, [{"_score": "desc"}], page_size, cursor, pit, source_fields
+            )
+
+        check_result_window(page_number, page_size)
         body = {
             "from": page_number * page_size,
             "size": page_size,
             "query": query,
         }
 
-        return await self._search(url, body)
+        return await self._search(url, body, source_fields)
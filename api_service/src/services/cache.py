@@ -0,0 +1,191 @@
+"""
+Формат записей кэша ответов в Redis.
+
+Запись состоит из байта формата, длины метаданных (4 байта), метаданных
+в JSON и самих данных. Байт формата определяет, чем сжаты данные.
+Записи старого формата (просто JSON ответа Elasticsearch) читаются как
+несжатые данные без метаданных.
+"""
+import hashlib
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+
+import orjson
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Байт формата: чем сжаты данные.
+FORMAT_RAW = 1
+FORMAT_ZLIB = 2
+FORMAT_LZ4 = 3
+FORMAT_ZSTD = 4
+
+HEADER = struct.Struct("!BI")
+
+
+class Codec:
+    """
+    Данные хранятся как есть.
+    """
+
+    name = "raw"
+    format = FORMAT_RAW
+    # Исключения `decompress` на поврежденных данных
+    errors: tuple[type[Exception], ...] = ()
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec(Codec):
+    name = "zlib"
+    format = FORMAT_ZLIB
+    errors = (zlib.error,)
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 1 if self.level is None else self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class Lz4Codec(Codec):
+    name = "lz4"
+    format = FORMAT_LZ4
+    errors = (RuntimeError,)
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4.frame.compress(data, compression_level=self.level or 0)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4.frame.decompress(data)
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    format = FORMAT_ZSTD
+    errors = (zstandard.ZstdError,) if zstandard is not None else ()
+
+    def __init__(self, level: Optional[int] = None):
+        super().__init__(level)
+        self._compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+def available_codecs() -> dict[str, type[Codec]]:
+    codecs = [Codec, ZlibCodec]
+    if lz4 is not None:
+        codecs.append(Lz4Codec)
+    if zstandard is not None:
+        codecs.append(ZstdCodec)
+    return {codec.name: codec for codec in codecs}
+
+
+def get_codec(name: str, level: Optional[int] = None) -> Codec:
+    codecs = available_codecs()
+    if name not in codecs:
+        raise ValueError(f"Cache codec {name!r} is not available, choose from {list(codecs)}")
+    return codecs[name](level)
+
+
+# Для чтения записей нужны все доступные кодеки, а не только выбранный для записи.
+DECODERS = {codec.format: codec() for codec in available_codecs().values()}
+
+
+def etag(payload: bytes) -> str:
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    payload: bytes
+    meta: dict = field(default_factory=dict)
+
+    @classmethod
+    def create(cls, payload: bytes, soft_ttl: int, hard_ttl: int) -> "CacheEntry":
+        """
+        :param soft_ttl: через сколько секунд запись нужно обновить в фоне.
+        :param hard_ttl: через сколько секунд запись нельзя отдавать,
+            если Elasticsearch доступен.
+        """
+        now = time.time()
+        return cls(payload, {"soft": now + soft_ttl, "hard": now + hard_ttl, "etag": etag(payload)})
+
+    @property
+    def etag(self) -> str:
+        """
+        Хэш данных для заголовка `ETag`. Хранится вместе с записью,
+        для записей без него вычисляется при первом обращении.
+        """
+        if "etag" not in self.meta:
+            self.meta["etag"] = etag(self.payload)
+        return self.meta["etag"]
+
+    def max_age(self, now: Optional[float] = None) -> int:
+        """
+        Сколько секунд запись еще не нужно обновлять.
+        """
+        now = now or time.time()
+        return max(0, int(self.meta.get("soft", now) - now))
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        return self.meta.get("soft", float("inf")) <= (now or time.time())
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return self.meta.get("hard", float("inf")) <= (now or time.time())
+
+    def pack(self, codec: Codec = DECODERS[FORMAT_RAW], min_size: int = 0) -> bytes:
+        """
+        :param codec: чем сжимать данные.
+        :param min_size: данные меньшего размера не сжимаются.
+        """
+        if len(self.payload) < min_size:
+            codec = DECODERS[FORMAT_RAW]
+        meta = orjson.dumps(self.meta)
+        return HEADER.pack(codec.format, len(meta)) + meta + codec.compress(self.payload)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CacheEntry":
+        """
+        :raises ValueError: запись повреждена или сжата недоступным кодеком.
+        """
+        if data[:1] in (b"{", b"["):
+            return cls(data)
+
+        try:
+            fmt, meta_size = HEADER.unpack_from(data)
+        except struct.error as e:
+            raise ValueError(f"Truncated cache entry: {e}") from e
+        if fmt not in DECODERS:
+            raise ValueError(f"Unknown cache entry format {fmt}")
+
+        meta_end = HEADER.size + meta_size
+        codec = DECODERS[fmt]
+        try:
+            payload = codec.decompress(data[meta_end:])
+        except codec.errors as e:
+            raise ValueError(f"Corrupt {codec.name} cache entry: {e}") from e
+        return cls(payload, orjson.loads(data[HEADER.size:meta_end]))
@@ -0,0 +1,70 @@
+"""
+Защита Elasticsearch от одновременных запросов за одним и тем же ключом
+при его отсутствии в кэше.
+"""
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from aioredis import Redis
+
+from db.redis_scripts import RELEASE_SCRIPT
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом внутри процесса.
+
+    Первый вызов выполняет функцию, остальные дожидаются его результата
+    (или исключения). Отмена одного из ожидающих не прерывает вычисление
+    для остальных.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class RedisLock:
+    """
+    Блокировка в Redis, общая для всех процессов сервиса.
+
+    Блокировка снимается автоматически через `timeout_ms`, если владелец
+    не освободил ее сам.
+    """
+
+    def __init__(self, redis: Redis, key: str, timeout_ms: int):
+        self.redis = redis
+        self.key = key
+        self.timeout_ms = timeout_ms
+        self._token: Optional[str] = None
+
+    async def acquire(self) -> bool:
+        token = uuid.uuid4().hex
+        if await self.redis.set(
+            self.key, token, pexpire=self.timeout_ms, exist=Redis.SET_IF_NOT_EXIST
+        ):
+            self._token = token
+            return True
+        return False
+
+    async def release(self) -> None:
+        if self._token is not None:
+            await self.redis.eval(RELEASE_SCRIPT, keys=[self.key], args=[self._token])
+            self._token = None
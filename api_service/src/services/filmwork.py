@@ -1,21 +1,70 @@
+import logging
 from functools import lru_cache
-from typing import Optional
+from typing import AsyncIterator, Optional
 from http import HTTPStatus
 
+import elasticsearch
+import orjson
 from aioredis import Redis
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends, HTTPException
 
-from db.elastic import get_elastic
+from core import config
+from db.elastic import call_elastic, get_elastic
 from db.redis import get_redis
 from models.filmwork import FilmWork
-from .base import MultiMatchSearchMixin, Service
+from .base import Fields, MultiMatchSearchMixin, Service, document_shaper
+from .pagination import TIEBREAKER_FIELD, check_result_window
+
+
+def build_film_filter(
+    genre: Optional[str] = None,
+    genre_id: Optional[str] = None,
+    rating_from: Optional[float] = None,
+    rating_to: Optional[float] = None,
+    type: Optional[str] = None,
+) -> dict:
+    """
+    Запрос для списка фильмов.
+
+    Условия помещаются в `bool.filter`: они не влияют на порядок (список
+    сортируется по рейтингу), поэтому Elasticsearch не считает релевантность
+    и кэширует результаты фильтров между запросами. Жанр ищется `match`
+    по анализируемому полю, как и раньше: без учета регистра.
+
+    :param genre: название жанра.
+    :param genre_id: идентификатор жанра.
+    :param rating_from: минимальный IMDB рейтинг включительно.
+    :param rating_to: максимальный IMDB рейтинг включительно.
+    :param type: тип кинопроизведения: `movie`, `tv_show` или `series`.
+    """
+    filters = []
+    if genre:
+        filters.append({"match": {"genres.name": genre}})
+    if genre_id:
+        filters.append({"term": {"genres.id.keyword": genre_id}})
+    if rating_from is not None or rating_to is not None:
+        rating = {}
+        if rating_from is not None:
+            rating["gte"] = rating_from
+        if rating_to is not None:
+            rating["lte"] = rating_to
+        filters.append({"range": {"imdb_rating": rating}})
+    if type:
+        filters.append({"term": {"type.keyword": type}})
+
+    if not filters:
+        return {"match_all": {}}
+    return {"bool": {"filter": filters}}
 
 
 class FilmService(MultiMatchSearchMixin, Service):
     es_index = "movies"
     model_type = FilmWork
 
+    # Поля для полнотекстового поиска
+    search_fields = ["title", "description"]
+
     async def get_films(
         self,
         url,
@@ -23,29 +72,188 @@ class FilmService(MultiMatchSearchMixin, Service):
         page_size: int,
         sort: str,
         genre: Optional[str] = None,
-    ) -> list[FilmWork]:
-        query = {"match_all": {}}
+        genre_id: Optional[str] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+        type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        pit: bool = False,
+        fields: Optional[str] = None,
+    ) -> bytes:
+        """
+        :param cursor: если задан, страница запрашивается после курсора
+            (пустая строка - первая страница), а `page_number` не используется.
+        :param fields: поля фильмов в ответе через запятую.
+
+        Остальные параметры см. в `build_film_filter`.
+        """
+        source_fields = self._fields(fields, config.FILM_LIST_FIELDS)
+        query = build_film_filter(genre, genre_id, rating_from, rating_to, type)
 
-        if genre:
-            query = {"match": {"genres.name": genre}}
+        order = {"imdb_rating": "asc" if sort == "imdb_rating" else "desc"}
 
+        if cursor is not None:
+            return await self._search_after(
+                url, query, [order], page_size, cursor, pit, source_fields, request_cache=True
+            )
+
+        check_result_window(page_number, page_size)
         body = {
             "from": page_number * page_size,
             "size": page_size,
             "query": query,
-            "sort": {"imdb_rating": "asc" if sort == "imdb_rating" else "desc"},
+            "sort": order,
         }
 
-        return await self._search(url, body=body)
+        return await self._search(url, body, source_fields, request_cache=True)
 
     async def search_films(
-        self, url: str, query: str, page_number: int, page_size: int
-    ) -> list[FilmWork]:
+        self,
+        url: str,
+        query: str,
+        page_number: int,
+        page_size: int,
+        cursor: Optional[str] = None,
+        pit: bool = False,
+        fields: Optional[str] = None,
+    ) -> bytes:
 
         return await self._multi_match_search(
-            url, query, page_number, page_size, ["title", "description"]
+            url,
+            query,
+            page_number,
+            page_size,
+            self.search_fields,
+            cursor,
+            pit,
+            self._fields(fields, config.FILM_SEARCH_FIELDS),
         )
 
+    async def get_facets(
+        self,
+        url: str,
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        genre_id: Optional[str] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+        type: Optional[str] = None,
+    ) -> bytes:
+        """
+        Число фильмов по жанрам и интервалам рейтинга одним запросом
+        агрегаций без документов.
+
+        :param query: текст для полнотекстового поиска по фильмам.
+        Остальные параметры см. в `build_film_filter`.
+        """
+        films = build_film_filter(genre, genre_id, rating_from, rating_to, type)
+        if query:
+            films = {
+                "bool": {
+                    "must": {"multi_match": {"query": query, "fields": self.search_fields}},
+                    "filter": films,
+                }
+            }
+
+        body = {
+            "size": 0,
+            "track_total_hits": True,
+            "query": films,
+            "aggs": {
+                "genres": {
+                    "terms": {"field": "genres.name.keyword", "size": config.FACETS_GENRES_SIZE}
+                },
+                "imdb_rating": {
+                    "histogram": {
+                        "field": "imdb_rating",
+                        "interval": config.FACETS_RATING_INTERVAL,
+                        "min_doc_count": 0,
+                        "extended_bounds": {"min": 0, "max": 10 - config.FACETS_RATING_INTERVAL},
+                    }
+                },
+            },
+        }
+
+        return await self._get_response(
+            url,
+            self._render_facets,
+            self.elastic.search,
+            index=self.es_index,
+            body=body,
+            request_cache=True,
+        )
+
+    async def export(self, fields: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Выгрузка всех фильмов в NDJSON.
+
+        Фильмы читаются пачками по `EXPORT_BATCH_SIZE` через point-in-time
+        и `search_after`, поэтому в памяти одновременно находится одна пачка,
+        а следующая запрашивается, только когда клиент принял предыдущую.
+        Кэш не используется.
+
+        Поля проверяются до начала выгрузки, чтобы об ошибке можно было
+        сообщить статусом ответа. Point-in-time открывается уже при чтении
+        первой пачки: генератор, который ни разу не читали, при `aclose()`
+        не выполняет `finally`, и point-in-time остался бы открытым
+        до истечения `SEARCH_PIT_KEEP_ALIVE`.
+
+        :param fields: поля фильмов через запятую, по умолчанию все поля.
+        :return: части тела ответа.
+        """
+        return self._export_batches(self._fields(fields))
+
+    async def _export_batches(self, fields: Fields) -> AsyncIterator[bytes]:
+        shape = document_shaper(self._model(fields))
+        body = self._project({
+            "size": config.EXPORT_BATCH_SIZE,
+            "query": {"match_all": {}},
+            "sort": [{TIEBREAKER_FIELD: "asc"}],
+        }, fields)
+        response = await call_elastic(
+            self.elastic.open_point_in_time,
+            index=self.es_index,
+            keep_alive=config.SEARCH_PIT_KEEP_ALIVE,
+        )
+        pit_id = response["id"]
+        try:
+            while True:
+                body["pit"] = {"id": pit_id, "keep_alive": config.SEARCH_PIT_KEEP_ALIVE}
+                response = await call_elastic(self.elastic.search, body=body)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if hits:
+                    yield b"".join(
+                        orjson.dumps(shape(doc["_source"]), option=orjson.OPT_APPEND_NEWLINE)
+                        for doc in hits
+                    )
+                if len(hits) < config.EXPORT_BATCH_SIZE:
+                    break
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            try:
+                await self.elastic.close_point_in_time(body={"id": pit_id})
+            except elasticsearch.TransportError as e:
+                logging.warning("Can't close point in time: %r", e)
+
+    def _render_facets(self, response: dict) -> bytes:
+        aggregations = response["aggregations"]
+        return orjson.dumps({
+            "total": response["hits"]["total"]["value"],
+            "genres": [
+                {"name": bucket["key"], "count": bucket["doc_count"]}
+                for bucket in aggregations["genres"]["buckets"]
+            ],
+            "imdb_rating": [
+                {
+                    "from": bucket["key"],
+                    "to": bucket["key"] + config.FACETS_RATING_INTERVAL,
+                    "count": bucket["doc_count"],
+                }
+                for bucket in aggregations["imdb_rating"]["buckets"]
+            ],
+        })
+
 
 @lru_cache()
 def get_film_service(
@@ -0,0 +1,61 @@
+"""
+Поколения индексов Elasticsearch для ключей кэша ответов.
+
+Ключи записей кэша начинаются с индекса и номера его поколения, который
+хранится в Redis под ключом `cache-generation:<index>`. После полной
+переиндексации ETL увеличивает номер поколения, и все записи индекса
+перестают использоваться одной командой INCR; старые записи истекают сами.
+
+Так же устроено поколение списков `cache-list-generation:<index>`: ETL
+увеличивает его при каждом изменении документов индекса, и страницы списков,
+поиска и агрегаций перестают использоваться, даже если измененного документа
+в них не было.
+"""
+import time
+from typing import Callable
+
+from aioredis import Redis
+
+from core import config
+
+
+def generation_key(index: str) -> str:
+    return f"cache-generation:{index}"
+
+
+def list_generation_key(index: str) -> str:
+    return f"cache-list-generation:{index}"
+
+
+class Generations:
+    """
+    Номера поколений индексов, известные процессу.
+
+    Номер обновляется сразу по сообщению ETL, а на случай пропущенного
+    сообщения перечитывается из Redis не реже раза в
+    `CACHE_GENERATION_TTL_SECONDS`.
+    """
+
+    def __init__(self, key: Callable[[str], str] = generation_key):
+        """
+        :param key: ключ Redis, в котором хранится номер поколения индекса.
+        """
+        self.key = key
+        self._generations: dict[str, tuple[int, float]] = {}
+
+    async def get(self, redis: Redis, index: str) -> int:
+        generation, loaded_at = self._generations.get(index, (0, 0.0))
+        if time.monotonic() - loaded_at >= config.CACHE_GENERATION_TTL_SECONDS:
+            generation = int(await redis.get(self.key(index)) or 0)
+            self.set(index, generation)
+        return generation
+
+    def set(self, index: str, generation: int) -> None:
+        self._generations[index] = (generation, time.monotonic())
+
+    def clear(self) -> None:
+        self._generations.clear()
+
+
+generations = Generations()
+list_generations = Generations(list_generation_key)
@@ -1,21 +1,130 @@
+import asyncio
+import logging
+import time
 from functools import lru_cache
+from typing import Optional
 
+import elasticsearch
+import orjson
+from aiobreaker import CircuitBreakerError
 from aioredis import Redis
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
-from db.elastic import get_elastic
+from core import config
+from core.context import add_cache_validator
+from db.elastic import call_elastic, get_elastic
 from db.redis import get_redis
 from models.genre import Genre
-from services.base import Service
+from services.base import Service, document_shaper
+from services.cache import etag
+
+
+class GenreCatalog:
+    """
+    Все жанры в памяти процесса.
+
+    Жанров немного и меняются они редко, поэтому они загружаются целиком при
+    старте приложения и перезагружаются раз в `GENRE_CATALOG_REFRESH_SECONDS`
+    или по сообщению ETL об изменении жанров. Ответы хранятся уже
+    сериализованными.
+    """
+
+    def __init__(self):
+        # id жанра -> тело ответа
+        self.genres: dict[str, bytes] = {}
+        # Тело ответа со всеми жанрами, отсортированными по названию.
+        # None, пока каталог не загружен.
+        self.list_body: Optional[bytes] = None
+        # тело ответа -> ETag
+        self.etags: dict[bytes, str] = {}
+        self.loaded_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.list_body is not None
+
+    async def load(self, elastic: AsyncElasticsearch) -> None:
+        response = await call_elastic(
+            elastic.search,
+            index=GenreService.es_index,
+            body={"size": config.GENRE_CATALOG_MAX_SIZE, "query": {"match_all": {}}},
+        )
+        total = response["hits"]["total"]["value"]
+        if total > config.GENRE_CATALOG_MAX_SIZE:
+            logging.warning(
+                "Genre catalog is truncated: %d of %d genres", config.GENRE_CATALOG_MAX_SIZE, total
+            )
+
+        shape = document_shaper(Genre)
+        genres = sorted(
+            (shape(doc["_source"]) for doc in response["hits"]["hits"]),
+            key=lambda genre: genre["name"],
+        )
+        self.genres = {str(genre["id"]): orjson.dumps(genre) for genre in genres}
+        self.list_body = orjson.dumps(genres)
+        self.etags = {body: etag(body) for body in (self.list_body, *self.genres.values())}
+        self.loaded_at = time.time()
+        logging.info("Loaded %d genres", len(genres))
+
+    async def refresh(self, elastic: AsyncElasticsearch) -> None:
+        """
+        Перезагружает каталог. Если Elasticsearch недоступен,
+        остается прежний каталог.
+        """
+        try:
+            await self.load(elastic)
+        except (elasticsearch.TransportError, CircuitBreakerError) as e:
+            logging.warning("Can't load genre catalog: %r", e)
+
+    def validate(self, body: bytes) -> bytes:
+        """
+        Добавляет к ответу `ETag` тела из каталога со сроком свежести
+        до следующей плановой перезагрузки.
+        """
+        max_age = self.loaded_at + config.GENRE_CATALOG_REFRESH_SECONDS - time.time()
+        add_cache_validator(self.etags[body], max(0, int(max_age)))
+        return body
+
+    def schedule_refresh(self, elastic: AsyncElasticsearch) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh(elastic))
+
+    async def run(self, elastic: AsyncElasticsearch) -> None:
+        """
+        Периодически перезагружает каталог, пока задачу не отменят.
+        """
+        while True:
+            await asyncio.sleep(config.GENRE_CATALOG_REFRESH_SECONDS)
+            await self.refresh(elastic)
+
+
+genre_catalog = GenreCatalog()
 
 
 class GenreService(Service):
     es_index = "genres"
     model_type = Genre
 
-    async def genre_list(self, url: str) -> list[Genre]:
-        return await self._search(url, {"query": {"match_all": {}}})
+    async def get_by_id(self, id: str) -> Optional[bytes]:
+        if genre_catalog.loaded:
+            body = genre_catalog.genres.get(id)
+            return genre_catalog.validate(body) if body is not None else None
+        return await super().get_by_id(id)
+
+    async def genre_list(self, url: str) -> bytes:
+        if genre_catalog.loaded:
+            return genre_catalog.validate(genre_catalog.list_body)
+        # Каталог еще не загружен: Elasticsearch был недоступен при старте.
+        return await self._search(
+            url,
+            {
+                "size": config.GENRE_CATALOG_MAX_SIZE,
+                "query": {"match_all": {}},
+                "sort": [{"name.keyword": "asc"}],
+            },
+        )
 
 
 @lru_cache()
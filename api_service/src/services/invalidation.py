@@ -0,0 +1,87 @@
+"""
+Инвалидация кэша ответов по сообщениям ETL.
+
+ETL публикует в канал `CACHE_INVALIDATION_CHANNEL` сообщения вида
+`{"index": "movies", "ids": ["...", ...]}` после обновления документов.
+Каждый процесс API подписан на канал и удаляет из Redis и из своего
+кэша первого уровня записи этих документов. В сообщении есть и новое
+поколение списков индекса (`"list_generation": 5`): с ним перестают
+использоваться страницы списков, поиска и агрегаций (см. `services.generations`).
+
+После полной переиндексации приходит сообщение
+`{"index": "movies", "generation": 2}` с новым поколением индекса
+(см. `services.generations`).
+
+Изменение жанров также перезагружает каталог жанров в памяти (см. `services.genre`).
+"""
+import asyncio
+import logging
+from typing import Iterable
+
+import orjson
+from aioredis import Redis, RedisError
+
+from core import config
+from db import elastic
+from .base import local_cache, refs_key
+from .generations import generations, list_generations
+from .genre import GenreService, genre_catalog
+
+RECONNECT_DELAY_SECONDS = 1
+
+
+async def invalidate(redis: Redis, index: str, ids: Iterable[str]) -> set[str]:
+    """
+    Удаляет записи кэша, построенные из документов `ids` индекса `index`.
+
+    Множества ссылок не удаляются: их читают и остальные процессы API,
+    чтобы очистить свой кэш первого уровня. Они истекают вместе с записями.
+
+    :return: удаленные ключи.
+    """
+    pipe = redis.pipeline()
+    futures = [pipe.smembers(refs_key(index, doc_id), encoding="utf-8") for doc_id in ids]
+    await pipe.execute()
+
+    keys = {key for future in futures for key in future.result()}
+    for key in keys:
+        local_cache.pop(key)
+    if keys:
+        await redis.delete(*keys)
+
+    logging.info("Invalidated %d cache keys for %d %s documents", len(keys), len(futures), index)
+    return keys
+
+
+async def handle_message(redis: Redis, message: dict) -> None:
+    if message["index"] == GenreService.es_index:
+        genre_catalog.schedule_refresh(elastic.es)
+
+    if "list_generation" in message:
+        list_generations.set(message["index"], int(message["list_generation"]))
+
+    if "generation" in message:
+        generations.set(message["index"], int(message["generation"]))
+        logging.info("Cache generation of %s is %s", message["index"], message["generation"])
+    else:
+        await invalidate(redis, message["index"], message["ids"])
+
+
+async def listen(redis: Redis) -> None:
+    """
+    Слушает канал инвалидации, пока задачу не отменят.
+    """
+    while True:
+        try:
+            channel, = await redis.subscribe(config.CACHE_INVALIDATION_CHANNEL)
+            # Пока канал был недоступен, поколения могли смениться.
+            generations.clear()
+            list_generations.clear()
+            async for message in channel.iter(decoder=orjson.loads):
+                try:
+                    await handle_message(redis, message)
+                except (KeyError, TypeError, RedisError) as e:
+                    logging.warning("Can't handle cache invalidation %r: %r", message, e)
+        except RedisError as e:
+            logging.warning("Cache invalidation channel is unavailable: %r", e)
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
@@ -0,0 +1,56 @@
+"""
+Постраничный вывод по курсору.
+
+Вместо `from` следующая страница запрашивается через `search_after` по значениям
+сортировки последнего документа предыдущей страницы, поэтому любая страница
+стоит Elasticsearch столько же, сколько первая, и не упирается в
+`max_result_window`.
+
+Курсор непрозрачен для клиента: это base64 от значений `search_after`
+и, если запрошен, идентификатора point-in-time.
+"""
+import base64
+import binascii
+from http import HTTPStatus
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException
+
+from core import config
+
+# Поле для однозначного порядка документов с одинаковыми значениями сортировки.
+# Индексы создаются с динамическим маппингом, поэтому у `id` есть подполе `keyword`.
+TIEBREAKER_FIELD = "id.keyword"
+
+
+def encode_cursor(search_after: list, pit_id: Optional[str] = None) -> str:
+    data = {"after": search_after}
+    if pit_id:
+        data["pit"] = pit_id
+    return base64.urlsafe_b64encode(orjson.dumps(data)).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[list], Optional[str]]:
+    """
+    :param cursor: курсор из предыдущего ответа или пустая строка для первой страницы.
+    :return: значения `search_after` и идентификатор point-in-time.
+    """
+    if not cursor:
+        return None, None
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return list(data["after"]), data.get("pit")
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor")
+
+
+def check_result_window(page_number: int, page_size: int) -> None:
+    """
+    Отклоняет страницы, которые Elasticsearch не сможет отдать по `from`.
+    """
+    if (page_number + 1) * page_size > config.SEARCH_MAX_RESULT_WINDOW:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="page is too deep, use cursor pagination",
+        )
@@ -1,14 +1,21 @@
 from functools import lru_cache
 from http import HTTPStatus
+from typing import Optional
 
+import elasticsearch
+import orjson
 from aioredis import Redis
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends, HTTPException
 
-from db.elastic import get_elastic
+from core import config
+from db.elastic import call_elastic, get_elastic
 from db.redis import get_redis
+from models.filmwork import FilmWorkShort
 from models.person import Person
-from services.base import MultiMatchSearchMixin, Service
+from services.base import BODY_KEY_PREFIX, MISSING, MultiMatchSearchMixin, Refs, Service, document_shaper
+from services.filmwork import FilmService
+from services.pagination import TIEBREAKER_FIELD, check_result_window
 
 
 class PersonService(MultiMatchSearchMixin, Service):
@@ -16,13 +23,70 @@ class PersonService(MultiMatchSearchMixin, Service):
     model_type = Person
 
     async def search_persons(
-        self, url: str, query: str, page_number: int, page_size: int
-    ) -> list[Person]:
+        self,
+        url: str,
+        query: str,
+        page_number: int,
+        page_size: int,
+        cursor: Optional[str] = None,
+        pit: bool = False,
+        fields: Optional[str] = None,
+    ) -> bytes:
 
         return await self._multi_match_search(
-            url, query, page_number, page_size, ["first_name", "last_name"]
+            url,
+            query,
+            page_number,
+            page_size,
+            ["first_name", "last_name"],
+            cursor,
+            pit,
+            self._fields(fields, config.PERSON_SEARCH_FIELDS),
         )
 
+    async def get_films(
+        self, url: str, person_id: str, page_number: int, page_size: int
+    ) -> Optional[bytes]:
+        """
+        Фильмы участника, от лучших по рейтингу к худшим.
+
+        Участник и его фильмы запрашиваются вместе и кэшируются одной записью,
+        из фильмов читаются только поля `FilmWorkShort`. Запись перестает
+        использоваться при изменении любого участника или фильма: в ключ входят
+        поколения списков обоих индексов.
+
+        :return: тело ответа или None, если участника нет.
+        """
+        check_result_window(page_number, page_size)
+
+        async def fetch() -> tuple[bytes, Refs]:
+            try:
+                person = await call_elastic(
+                    self.elastic.get, index=self.es_index, id=person_id, _source=["film_ids"]
+                )
+            except elasticsearch.NotFoundError:
+                return MISSING, [(self.es_index, person_id)]
+
+            response = await call_elastic(
+                self.elastic.search,
+                index=FilmService.es_index,
+                body={
+                    "from": page_number * page_size,
+                    "size": page_size,
+                    "query": {"ids": {"values": person["_source"].get("film_ids", [])}},
+                    "sort": [{"imdb_rating": "desc"}, {TIEBREAKER_FIELD: "asc"}],
+                    "_source": list(FilmWorkShort.__fields__),
+                },
+            )
+            shape = document_shaper(FilmWorkShort)
+            body = orjson.dumps([shape(doc["_source"]) for doc in response["hits"]["hits"]])
+            return body, []
+
+        # Запись строится из двух ответов Elasticsearch, поэтому всегда
+        # кэшируется готовое тело ответа.
+        key = await self._cache_key(url, lists=[self.es_index, FilmService.es_index])
+        body = await self._get_cached(BODY_KEY_PREFIX + key, fetch)
+        return None if body == MISSING else body
 
 
 @lru_cache()
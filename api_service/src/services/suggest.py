@@ -0,0 +1,62 @@
+from functools import lru_cache
+
+import orjson
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+
+from db.elastic import call_elastic, get_elastic
+from db.redis import get_redis
+from models.suggestion import Suggestion
+from services.base import BODY_KEY_PREFIX, Refs, Service, document_shaper
+
+
+class SuggestService(Service):
+    """
+    Подсказки для строки поиска по индексу `suggest`, который заполняет ETL.
+
+    Используется completion suggester: он ищет по префиксу в структуре
+    в памяти Elasticsearch и намного дешевле полнотекстового поиска.
+    """
+
+    es_index = "suggest"
+    model_type = Suggestion
+
+    async def suggest(self, query: str, size: int) -> bytes:
+        # Подсказки не зависят от регистра и лишних пробелов,
+        # поэтому такие варианты ввода используют одну запись кэша.
+        prefix = " ".join(query.lower().split())
+
+        async def fetch() -> tuple[bytes, Refs]:
+            response = await call_elastic(
+                self.elastic.search,
+                index=self.es_index,
+                body={
+                    "_source": list(Suggestion.__fields__),
+                    "suggest": {
+                        "suggestions": {
+                            "prefix": prefix,
+                            "completion": {
+                                "field": "suggest",
+                                "size": size,
+                                "skip_duplicates": True,
+                            },
+                        }
+                    },
+                },
+            )
+            options = response["suggest"]["suggestions"][0]["options"]
+            shape = document_shaper(Suggestion)
+            body = orjson.dumps([shape(option["_source"]) for option in options])
+            return body, []
+
+        key = await self._cache_key(f"suggest/{size}/{prefix}")
+        return await self._get_cached(BODY_KEY_PREFIX + key, fetch)
+
+
+@lru_cache()
+def get_suggest_service(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> SuggestService:
+    return SuggestService(redis, elastic)
@@ -1,6 +1,10 @@
-from fastapi import Request
+from http import HTTPStatus
+
+from fastapi import HTTPException, Request, Response
 from furl import furl
 
+from core import config, context
+
 
 def request_to_str(request: Request) -> str:
     """
@@ -12,3 +16,24 @@ def request_to_str(request: Request) -> str:
     """
     pathstr = furl(request.url).pathstr
     return furl(pathstr, query_params=request.query_params).tostr()
+
+
+def json_response(body: bytes) -> Response:
+    """
+    Ответ с уже сериализованным в JSON телом.
+    """
+    return Response(content=body, media_type="application/json")
+
+
+async def profile_flag(profile: bool = False) -> bool:
+    """
+    Параметр `profile`: выполнить запросы к Elasticsearch с профилированием.
+    Ответ не берется из кэша, разбивка времени возвращается в заголовке `Server-Timing`.
+    Доступен только пользователям с ролью `PROFILE_ROLE`.
+    """
+    if profile:
+        if config.PROFILE_ROLE not in context.user_roles.get():
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="profiling is not allowed")
+        # Зависимость выполняется в той же задаче, что и обработчик запроса.
+        context.profiling.set(True)
+    return profile
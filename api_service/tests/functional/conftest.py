@@ -31,12 +31,15 @@ def setup_indices():
     """
     Создать необходимые индексы в ES и заполнить их данными.
     """
-    indices = "movies persons genres".split()
+    indices = "movies persons genres suggest".split()
 
     for index in indices:
         with TEST_DATA_DIR.joinpath("elastic", f"{index}.json").open() as file:
             data = json.load(file)
-        requests.put(urljoin(settings.es_url, index))
+        # Схема индекса, если динамической недостаточно
+        mapping_file = TEST_DATA_DIR.joinpath("elastic", f"{index}_mapping.json")
+        mapping = json.loads(mapping_file.read_text()) if mapping_file.exists() else None
+        requests.put(urljoin(settings.es_url, index), json=mapping)
         bulk_insert(settings.es_url, index, data)
 
         time.sleep(0.5)
@@ -1,21 +1,28 @@
+import json
 from pathlib import Path
 
 import pytest
 
 from ..testdata.test_parameters.film_params import (
+    batch_params,
     combined_params,
     default_params,
     film_id_params,
+    fields_params,
+    filter_params,
     genre_params,
     page_num_params,
     page_size_params,
     sort_params,
 )
-from ..utils import conclude_result
+from ..settings import TestSettings
+from ..utils import conclude_result, get_data_from_file
 
 parent_dir = Path(__file__).parents[1]
 files_dir = parent_dir.joinpath("testdata", "expected_data", "films")
 
+settings = TestSettings()
+
 
 @pytest.mark.parametrize(
     "query_params, expected_data_file, status, page_size",
@@ -26,6 +33,8 @@ files_dir = parent_dir.joinpath("testdata", "expected_data", "films")
         *page_size_params,
         *genre_params,
         *combined_params,
+        *fields_params,
+        *filter_params,
     ],
 )
 @pytest.mark.usefixtures("clear_cache")
@@ -57,3 +66,89 @@ async def test_film_by_id(
     response = await make_get_request(f"""/film/{film_id}""", {})
 
     conclude_result(response.body, response.status, expected_data_file, status, None, files_dir)
+
+
+@pytest.mark.parametrize("film_ids, expected_data_files", [*batch_params])
+@pytest.mark.usefixtures("clear_cache")
+@pytest.mark.asyncio
+async def test_films_batch(make_get_request, film_ids: list, expected_data_files: list):
+    """
+    Проверка запроса нескольких фильмов по списку id
+    """
+    response = await make_get_request("/film/batch", {"ids": ",".join(film_ids)})
+
+    expected_data = [get_data_from_file(files_dir, file) for file in expected_data_files]
+    conclude_result(response.body, response.status, None, 200, len(expected_data), files_dir)
+    assert response.body == expected_data
+
+
+@pytest.mark.usefixtures("clear_cache")
+@pytest.mark.asyncio
+async def test_film_list_cursor(make_get_request):
+    """
+    Проверка постраничного вывода списка фильмов по курсору
+    """
+    film_ids = []
+    cursor = ""
+    while cursor is not None:
+        response = await make_get_request("/film", {"cursor": cursor, "page_size": 300})
+        assert response.status == 200
+        film_ids.extend(film["id"] for film in response.body["items"])
+        cursor = response.body["cursor"]
+
+    assert len(film_ids) == len(set(film_ids)) == 999
+
+
+@pytest.mark.usefixtures("clear_cache")
+@pytest.mark.asyncio
+async def test_film_facets(make_get_request):
+    """
+    Проверка числа фильмов по жанрам и рейтингу
+    """
+    response = await make_get_request("/film/facets", {})
+    assert response.status == 200
+    assert response.body["total"] == 999
+
+    genres = {facet["name"]: facet["count"] for facet in response.body["genres"]}
+    assert genres["Documentary"] == 152
+    assert genres["Reality-TV"] == 38
+
+    response = await make_get_request("/film/facets", {"rating_from": 8})
+    assert response.status == 200
+    assert response.body["total"] == sum(facet["count"] for facet in response.body["imdb_rating"])
+
+
+@pytest.mark.asyncio
+async def test_films_export(session):
+    """
+    Проверка выгрузки всех фильмов в NDJSON
+    """
+    url = settings.api_base_url + "/film/export"
+    async with session.get(url, params={"fields": "title"}) as response:
+        assert response.status == 200
+        assert response.content_type == "application/x-ndjson"
+        films = [json.loads(line) async for line in response.content if line.strip()]
+
+    assert len(films) == len({film["id"] for film in films}) == 999
+    assert all(set(film) == {"id", "title"} for film in films)
+
+
+@pytest.mark.usefixtures("clear_cache")
+@pytest.mark.asyncio
+async def test_film_not_modified(session):
+    """
+    Проверка условного запроса фильма по ETag
+    """
+    url = settings.api_base_url + "/film/f92c6b11-3f73-4c3f-a9e3-85b1bb91284b"
+    async with session.get(url) as response:
+        assert response.status == 200
+        assert response.headers["Cache-Control"].startswith("private, max-age=")
+        assert "max-age=" in response.headers["Cache-Control"]
+
+    async with session.get(url, headers={"If-None-Match": etag}) as response:
+        assert response.status == 304
+        assert response.headers["ETag"] == etag
+        assert await response.read() == b""
+
+    async with session.get(url, headers={"If-None-Match": '"outdated"'}) as response:
+        assert response.status == 200
@@ -4,7 +4,8 @@ import pytest
 
 from ..utils import conclude_result
 from ..testdata.test_parameters.person_params import  (
-    person_id_params
+    person_films_params,
+    person_id_params,
 )
 
 parent_dir = Path(__file__).parents[1]
@@ -22,4 +23,18 @@ async def test_person_by_id(
     """
     response = await make_get_request(f"""/person/{person_id}""", {})
 
-    conclude_result(response.body, response.status, expected_data_file, status, None, files_dir)
\ No newline at end of file
+    conclude_result(response.body, response.status, expected_data_file, status, None, files_dir)
+
+
+@pytest.mark.parametrize("person_id, expected_data_file, status", [*person_films_params])
+@pytest.mark.usefixtures("clear_cache")
+@pytest.mark.asyncio
+async def test_person_films(
+    make_get_request, person_id: str, expected_data_file: str, status: int
+):
+    """
+    Проверка запроса фильмов участника
+    """
+    response = await make_get_request(f"""/person/{person_id}/film""", {})
+
+    conclude_result(response.body, response.status, expected_data_file, status, None, files_dir)
@@ -0,0 +1,22 @@
+import pytest
+
+from ..testdata.test_parameters.suggest_params import suggest_params
+from ..utils import conclude_result
+
+
+@pytest.mark.parametrize("query_params, status, page_size", [*suggest_params])
+@pytest.mark.usefixtures("clear_cache")
+@pytest.mark.asyncio
+async def test_suggest(make_get_request, query_params: dict, status: int, page_size: int):
+    """
+    Проверка подсказок для строки поиска
+    """
+    response = await make_get_request("/suggest/", query_params)
+
+    conclude_result(response.body, response.status, None, status, page_size, None)
+
+    if status == 200:
+        first_word = query_params["q"].lower().split()[0]
+        for suggestion in response.body:
+            assert suggestion["type"] in ("film", "person")
+            assert first_word in suggestion["name"].lower()
@@ -53,7 +53,23 @@ genre_params = [
     ({"genre": "Reality-TV"}, "film_list_genre_realitytv.json", 200, 38),
 
     # несуществующий жанр
-    ({"genre": "Cartoon"}, None, 200, 0)
+    ({"genre": "Cartoon"}, None, 200, 0),
+
+    # фильтрация по id жанра
+    ({"genre_id": "43817153-eae0-4519-939e-0c3c81da6ed3"}, "film_list_genre_documentary.json", 200, 50),
+    ({"genre_id": "2ada0e48-48ea-4840-9d1d-c2e28ceb6406"}, "film_list_genre_realitytv.json", 200, 38)
+]
+
+
+filter_params = [
+    # фильтрация по рейтингу
+    ({"rating_from": 8, "rating_to": 9, "page_size": 200}, None, 200, 149),
+
+    # рейтинг и жанр вместе
+    ({"genre": "Documentary", "rating_from": 7, "page_size": 100}, None, 200, 88),
+
+    # неверный тип
+    ({"type": "cartoon"}, None, 422, None)
 ]
 
 
@@ -69,6 +85,15 @@ combined_params = [
     ({"genre": "Comedy", "page_size": 10, "page_number": 100}, None, 200, 0)
 ]
 
+
+fields_params = [
+    # только запрошенные поля
+    ({"fields": "title,imdb_rating"}, "film_list_fields.json", 200, 50),
+
+    # несуществующее поле
+    ({"fields": "rating"}, None, 400, None)
+]
+
 # Формат параметров: (film_id, expected_data_list, response_status)
 film_id_params = [
     # запрос к существующим id
@@ -80,3 +105,16 @@ film_id_params = [
     # запрос к несуществующему id
     ('c8cb8aa5-926c-4180-81cb-404e2be58a2c', None, 404)
 ]
+
+
+batch_params = [
+    # существующие фильмы возвращаются в порядке запроса, несуществующие пропускаются
+    (['5a5f31ab-d212-4512-8e2b-23421854508a',
+      'c8cb8aa5-926c-4180-81cb-404e2be58a2c',
+      'f92c6b11-3f73-4c3f-a9e3-85b1bb91284b'],
+     ["film_id_5a5f31ab-d212-4512-8e2b-23421854508a.json",
+      "film_id_f92c6b11-3f73-4c3f-a9e3-85b1bb91284b.json"]),
+
+    # только несуществующие фильмы
+    (['c8cb8aa5-926c-4180-81cb-404e2be58a2c'], []),
+]
@@ -1,7 +1,7 @@
 # Формат параметров: (query_params, expected_data_file, response_status, page_size)
 
 # проверка параметров по умолчанию
-default_params = [({}, "genre_list_default.json", 200, 10)]
+default_params = [({}, "genre_list_default.json", 200, 26)]
 
 # Формат параметров: (genre_id, expected_data_list, response_status)
 genre_id_params = [
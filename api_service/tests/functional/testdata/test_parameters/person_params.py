@@ -5,4 +5,13 @@ person_id_params = [
     ('338d3c7e-e089-4287-ac13-d5a403f28bc6', "person_id_338d3c7e-e089-4287-ac13-d5a403f28bc6.json", 200),
     # запрос к несуществующему id
     ('24e98779-ef9e-47da-a018-39435c3997d4', None, 404)
-]
\ No newline at end of file
+]
+
+# Формат параметров: (person_id, expected_data_list, response_status)
+person_films_params = [
+    # фильмы существующих участников
+    ('f52ed150-be42-4b6d-b6b7-397018b4a6f4', "person_films_f52ed150-be42-4b6d-b6b7-397018b4a6f4.json", 200),
+    ('338d3c7e-e089-4287-ac13-d5a403f28bc6', "person_films_338d3c7e-e089-4287-ac13-d5a403f28bc6.json", 200),
+    # несуществующий участник
+    ('24e98779-ef9e-47da-a018-39435c3997d4', None, 404)
+]
@@ -0,0 +1,13 @@
+# Формат параметров: (query_params, response_status, page_size)
+suggest_params = [
+    # подсказки по началу любого слова названия или имени
+    ({"q": "sta"}, 200, 10),
+    ({"q": "Star  Wa", "size": 3}, 200, 3),
+
+    # ничего не найдено
+    ({"q": "zzzzzz"}, 200, 0),
+
+    # пустой запрос и слишком много подсказок
+    ({"q": ""}, 422, None),
+    ({"q": "sta", "size": 1000}, 422, None)
+]
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Модули сервиса импортируются так же, как при запуске из src
+sys.path.insert(0, str(Path(__file__).parents[2].joinpath("src")))
+
+from db.elastic import es_breaker  # noqa: E402
+from services import base  # noqa: E402
+from services.generations import generations, list_generations  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Кэш первого уровня, поколения индексов и предохранитель Elasticsearch
+    общие для всего процесса.
+    """
+    for cache in (base.local_cache, generations, list_generations):
+        cache.clear()
+    es_breaker.close()
+    yield
+    for cache in (base.local_cache, generations, list_generations):
+        cache.clear()
+    es_breaker.close()
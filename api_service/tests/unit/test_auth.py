@@ -0,0 +1,147 @@
+import time
+import uuid
+from http import HTTPStatus
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core import auth, config
+from db.fake_redis import FakeRedis
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+PUBLIC_KEY = PRIVATE_KEY.public_key().public_bytes(
+    serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+).decode()
+
+
+def create_token(expire_in: int = 3600, roles: tuple = ("user",), **claims) -> tuple[str, dict]:
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "jti": str(uuid.uuid4()),
+        "type": "access",
+        "roles": list(roles),
+        "exp": int(time.time()) + expire_in,
+        **claims,
+    }
+    return jwt.encode(payload, PRIVATE_KEY, algorithm="RS256"), payload
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def clear_decisions():
+    auth.decisions.clear()
+    yield
+    auth.decisions.clear()
+
+
+@pytest.fixture
+def local_key(monkeypatch):
+    monkeypatch.setattr(auth, "public_key", PUBLIC_KEY)
+    monkeypatch.setattr(auth, "algorithm", "RS256")
+
+
+@pytest.fixture
+def auth_service(monkeypatch):
+    """
+    Сервис авторизации без публичного ключа: токены проверяются запросом к нему.
+    Ключ в настройках пустой, как при `AUTH_PUBLIC_KEY=` в .env.
+    Возвращает список полученных им запросов.
+    """
+    received = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        if request.url.path == "/auth/v1/public_key":
+            return httpx.Response(404)
+        if request.headers.get("Authorization") == "Bearer remote-token":
+            return httpx.Response(200, json={"roles": ["user"], "exp": int(time.time()) + 3600})
+        return httpx.Response(401)
+
+    monkeypatch.setattr(auth, "public_key", "")
+    monkeypatch.setattr(auth, "http_client", httpx.AsyncClient(
+        base_url="http://auth", transport=httpx.MockTransport(handle)
+    ))
+    return received
+
+
+@pytest.mark.usefixtures("local_key")
+@pytest.mark.asyncio
+async def test_local_decode():
+    token, payload = create_token(roles=("user", "subscriber"))
+
+    assert await auth.authorize(FakeRedis(), bearer(token)) == (HTTPStatus.OK, frozenset({"user", "subscriber"}))
+    assert await auth.authorize(FakeRedis(), {}) == (HTTPStatus.UNAUTHORIZED, frozenset())
+    expired, _ = create_token(expire_in=-10)
+    assert (await auth.authorize(FakeRedis(), bearer(expired)))[0] == HTTPStatus.UNAUTHORIZED
+    no_roles, _ = create_token(roles=())
+    assert (await auth.authorize(FakeRedis(), bearer(no_roles)))[0] == HTTPStatus.FORBIDDEN
+
+
+@pytest.mark.usefixtures("local_key")
+@pytest.mark.asyncio
+async def test_revoked_token():
+    """
+    Отзыв отдельного токена и выход со всех устройств, как их записывает сервис авторизации.
+    """
+    redis = FakeRedis()
+    token, payload = create_token()
+    await redis.set(payload["jti"], "revoked")
+    assert (await auth.authorize(redis, bearer(token)))[0] == HTTPStatus.UNAUTHORIZED
+
+    token, payload = create_token()
+    await redis.set(f"{payload['sub']}-soa", "1")
+    assert (await auth.authorize(redis, bearer(token)))[0] == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_remote_fallback(auth_service):
+    """
+    С пустым `AUTH_PUBLIC_KEY` и без ключа у сервиса авторизации (HS256)
+    токены проверяет сервис авторизации.
+    """
+    async with auth.http_client:
+        await auth.load_public_key()
+        assert not auth.public_key
+
+        redis = FakeRedis()
+        assert await auth.authorize(redis, bearer("remote-token")) == (HTTPStatus.OK, frozenset({"user"}))
+        assert (await auth.authorize(redis, bearer("other-token")))[0] == HTTPStatus.UNAUTHORIZED
+        # Решение кэшируется: повторный запрос не доходит до сервиса авторизации
+        await auth.authorize(redis, bearer("remote-token"))
+
+    assert [request.url.path for request in auth_service] == [
+        "/auth/v1/public_key", "/auth/v1/authorize", "/auth/v1/authorize",
+    ]
+
+
+@pytest.mark.usefixtures("local_key")
+@pytest.mark.asyncio
+async def test_decision_cache_ttl(monkeypatch):
+    """
+    Решение кэшируется не дольше `AUTH_CACHE_TTL_SECONDS` и срока жизни токена.
+    """
+    monkeypatch.setattr(config, "AUTH_CACHE_TTL_SECONDS", 30)
+    now = time.monotonic()
+    redis = FakeRedis()
+    short, short_payload = create_token(expire_in=5)
+    long, long_payload = create_token(expire_in=3600)
+    for token in (short, long):
+        assert (await auth.authorize(redis, bearer(token)))[0] == HTTPStatus.OK
+
+    # Отзыв не виден, пока решение в кэше
+    await redis.set(short_payload["jti"], "revoked")
+    await redis.set(long_payload["jti"], "revoked")
+    assert (await auth.authorize(redis, bearer(short)))[0] == HTTPStatus.OK
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert (await auth.authorize(redis, bearer(short)))[0] == HTTPStatus.UNAUTHORIZED
+    assert (await auth.authorize(redis, bearer(long)))[0] == HTTPStatus.OK
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert (await auth.authorize(redis, bearer(long)))[0] == HTTPStatus.UNAUTHORIZED
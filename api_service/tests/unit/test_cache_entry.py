@@ -0,0 +1,63 @@
+import orjson
+import pytest
+
+from services.cache import FORMAT_RAW, HEADER, CacheEntry, available_codecs, get_codec
+
+PAYLOAD = orjson.dumps([{"id": str(id), "title": "Film"} for id in range(100)])
+
+
+@pytest.mark.parametrize("name", list(available_codecs()))
+def test_round_trip(name):
+    entry = CacheEntry.create(PAYLOAD, soft_ttl=60, hard_ttl=300)
+    data = entry.pack(get_codec(name))
+
+    unpacked = CacheEntry.unpack(data)
+    assert unpacked.payload == PAYLOAD
+    assert unpacked.meta == entry.meta
+    if name != "raw":
+        assert len(data) < len(PAYLOAD)
+
+
+def test_legacy_entry():
+    """
+    Записи старого формата - ответ Elasticsearch в JSON без метаданных.
+    """
+    entry = CacheEntry.unpack(PAYLOAD)
+
+    assert entry.payload == PAYLOAD
+    assert not entry.is_stale() and not entry.is_expired()
+    assert entry.etag
+
+
+def test_min_size():
+    """
+    Данные меньше `min_size` (`CACHE_CODEC_MIN_SIZE`) не сжимаются.
+    """
+    entry = CacheEntry.create(PAYLOAD, soft_ttl=60, hard_ttl=300)
+
+    assert HEADER.unpack_from(entry.pack(get_codec("zlib"), min_size=len(PAYLOAD) + 1))[0] == FORMAT_RAW
+    assert HEADER.unpack_from(entry.pack(get_codec("zlib"), min_size=len(PAYLOAD)))[0] != FORMAT_RAW
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("brotli")
+
+
+@pytest.mark.parametrize("name", [name for name in available_codecs() if name != "raw"])
+def test_corrupt_entry(name):
+    """
+    Поврежденные записи читаются как `ValueError`, то есть как промах кэша.
+    """
+    data = CacheEntry.create(PAYLOAD, soft_ttl=60, hard_ttl=300).pack(get_codec(name))
+    meta_end = HEADER.size + HEADER.unpack_from(data)[1]
+
+    for corrupt in (
+        data[:3],  # обрезан заголовок
+        data[:meta_end - 1],  # обрезаны метаданные
+        data[:-10],  # обрезаны данные
+        data[:meta_end] + b"garbage" + data[meta_end + 7:],
+        bytes([99]) + data[1:],  # неизвестный формат
+    ):
+        with pytest.raises(ValueError):
+            CacheEntry.unpack(corrupt)
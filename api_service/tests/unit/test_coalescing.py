@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from core import config, metrics
+from db.fake_elastic import FakeElasticsearch
+from db.fake_redis import FakeRedis
+from services.coalescing import RedisLock, SingleFlight
+from services.filmwork import FilmService
+
+MOVIE = {"id": "m1", "title": "First", "imdb_rating": 5.0}
+
+
+def redis_lookups() -> float:
+    return sum(
+        sample.value
+        for sample in next(iter(metrics.CACHE_LOOKUPS.collect())).samples
+        if sample.name.endswith("_total") and sample.labels["level"] == "redis"
+    )
+
+
+@pytest.fixture
+def cache_lock(monkeypatch):
+    monkeypatch.setattr(config, "CACHE_LOCK_ENABLED", True)
+    monkeypatch.setattr(config, "CACHE_LOCK_TIMEOUT_MS", 5000)
+    monkeypatch.setattr(config, "CACHE_LOCK_POLL_MS", 10)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_error():
+    """
+    Ошибку единственного вызова получают все ожидающие,
+    а следующий вызов выполняется заново.
+    """
+    flight = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(5)), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert (flight.calls, flight.coalesced) == (1, 4)
+
+    with pytest.raises(RuntimeError):
+        await flight.do("key", fail)
+    assert calls == 2
+
+
+@pytest.mark.usefixtures("cache_lock")
+@pytest.mark.asyncio
+async def test_lock_contention():
+    """
+    Процессы с общим Redis запрашивают ключ у Elasticsearch один раз,
+    опросы ожидающих не считаются обращениями к кэшу.
+    """
+    redis, es = FakeRedis(), FakeElasticsearch({"movies": [MOVIE]}, latency=0.05)
+    # Каждый экземпляр сервиса изображает отдельный процесс со своим SingleFlight.
+    services = [FilmService(redis, es) for _ in range(4)]
+    lookups = redis_lookups()
+
+    bodies = await asyncio.gather(*(service.get_by_id("m1") for service in services))
+
+    assert len(set(bodies)) == 1
+    assert es.calls["get"] == 1
+    assert redis_lookups() - lookups == len(services)
+
+
+@pytest.mark.usefixtures("cache_lock")
+@pytest.mark.asyncio
+async def test_lock_released_without_entry():
+    """
+    Если владелец блокировки не сохранил запись, ожидающие не ждут
+    до истечения блокировки.
+    """
+    redis, es = FakeRedis(), FakeElasticsearch({"movies": [MOVIE]})
+    service = FilmService(redis, es)
+    key = await service._doc_key("m1")
+    owner = RedisLock(redis, f"lock:{key}", config.CACHE_LOCK_TIMEOUT_MS)
+    assert await owner.acquire()
+
+    async def fail_in_owner():
+        await asyncio.sleep(0.05)
+        await owner.release()
+
+    started = time.monotonic()
+    body, _ = await asyncio.gather(service.get_by_id("m1"), fail_in_owner())
+
+    assert b"First" in body
+    assert es.calls["get"] == 1
+    assert time.monotonic() - started < 1
@@ -0,0 +1,109 @@
+import elasticsearch
+import pytest
+
+from db.fake_elastic import FakeElasticsearch
+from services.filmwork import build_film_filter
+from services.pagination import TIEBREAKER_FIELD
+
+DRAMA = {"id": "g1", "name": "Drama"}
+COMEDY = {"id": "g2", "name": "Comedy"}
+
+MOVIES = [
+    {"id": "m1", "title": "ab", "imdb_rating": 7.5, "genres": [DRAMA]},
+    {"id": "m2", "title": "abc", "imdb_rating": 7.5, "genres": [DRAMA, COMEDY]},
+    {"id": "m3", "title": "b", "imdb_rating": 3.0, "genres": [COMEDY]},
+    {"id": "m4", "title": "c", "imdb_rating": None, "genres": [DRAMA]},
+    {"id": "m5", "title": "d", "imdb_rating": 9.1, "genres": []},
+]
+
+
+@pytest.fixture
+def es():
+    return FakeElasticsearch({"movies": MOVIES})
+
+
+def ids(response: dict) -> list[str]:
+    return [hit["_id"] for hit in response["hits"]["hits"]]
+
+
+@pytest.mark.asyncio
+async def test_film_filter(es):
+    """
+    Фильтр списка фильмов: жанр (без учета регистра) и рейтинг в `bool.filter`.
+    """
+    query = build_film_filter(genre="drama", rating_from=5, rating_to=8)
+    response = await es.search(index="movies", body={"query": query, "sort": [{"id.keyword": "asc"}]})
+
+    assert ids(response) == ["m1", "m2"]
+    assert response["hits"]["total"]["value"] == 2
+
+
+@pytest.mark.asyncio
+async def test_search_after(es):
+    """
+    Страницы по `search_after` с сортировкой по рейтингу и `id.keyword`
+    для равных значений. Документ без рейтинга - в конце.
+    """
+    body = {"query": {"match_all": {}}, "size": 2, "sort": [{"imdb_rating": "desc"}, {TIEBREAKER_FIELD: "asc"}]}
+    found = []
+    while True:
+        hits = (await es.search(index="movies", body=body))["hits"]["hits"]
+        if not hits:
+            break
+        found.extend(hit["_id"] for hit in hits)
+        body["search_after"] = hits[-1]["sort"]
+
+    assert found == ["m5", "m1", "m2", "m3", "m4"]
+
+
+@pytest.mark.asyncio
+async def test_string_sort_desc(es):
+    """
+    Строка идет раньше своего префикса при сортировке по убыванию.
+    """
+    response = await es.search(index="movies", body={"sort": [{"title.keyword": "desc"}]})
+
+    assert ids(response) == ["m5", "m4", "m3", "m2", "m1"]
+
+
+@pytest.mark.asyncio
+async def test_facets(es):
+    """
+    Агрегации фасетов: `terms` по жанрам и `histogram` по рейтингу
+    с пустыми интервалами до границ `extended_bounds`.
+    """
+    body = {
+        "size": 0,
+        "query": build_film_filter(),
+        "aggs": {
+            "genres": {"terms": {"field": "genres.name.keyword", "size": 10}},
+            "imdb_rating": {
+                "histogram": {
+                    "field": "imdb_rating",
+                    "interval": 2,
+                    "min_doc_count": 0,
+                    "extended_bounds": {"min": 0, "max": 8},
+                }
+            },
+        },
+    }
+    aggregations = (await es.search(index="movies", body=body))["aggregations"]
+
+    assert aggregations["genres"]["buckets"] == [
+        {"key": "Drama", "doc_count": 3},
+        {"key": "Comedy", "doc_count": 2},
+    ]
+    assert [(bucket["key"], bucket["doc_count"]) for bucket in aggregations["imdb_rating"]["buckets"]] == [
+        (0, 0), (2, 1), (4, 0), (6, 2), (8, 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get(es):
+    response = await es.get(index="movies", id="m1", _source=["title"])
+    assert response["_id"] == "m1"
+    assert response["_source"] == {"title": "ab"}
+
+    with pytest.raises(elasticsearch.NotFoundError):
+        await es.get(index="movies", id="unknown")
+    assert es.calls["get"] == 2
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from db.fake_redis import FakeRedis
+from services.coalescing import RedisLock
+
+
+@pytest.mark.asyncio
+async def test_set_if_not_exist_with_expire():
+    """
+    `SET NX PX`, как при захвате блокировки.
+    """
+    redis = FakeRedis()
+
+    assert await redis.set("key", "first", pexpire=50, exist=FakeRedis.SET_IF_NOT_EXIST)
+    assert await redis.set("key", "second", pexpire=50, exist=FakeRedis.SET_IF_NOT_EXIST) is None
+    assert await redis.get("key") == b"first"
+
+    await asyncio.sleep(0.06)
+    assert await redis.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_lock_release():
+    """
+    Блокировку снимает только ее владелец.
+    """
+    redis = FakeRedis()
+    lock = RedisLock(redis, "lock", timeout_ms=1000)
+    other = RedisLock(redis, "lock", timeout_ms=1000)
+
+    assert await lock.acquire()
+    assert not await other.acquire()
+    await other.release()
+    assert await redis.get("lock") is not None
+
+    await lock.release()
+    assert await redis.get("lock") is None
+
+
+@pytest.mark.asyncio
+async def test_unsupported_script():
+    redis = FakeRedis()
+
+    with pytest.raises(ValueError, match="return 1"):
+        await redis.eval("return 1")
+
+
+@pytest.mark.asyncio
+async def test_pipeline():
+    """
+    Команды конвейера выполняются по порядку за один обмен с Redis.
+    """
+    redis = FakeRedis()
+    await redis.set("a", 1)
+
+    pipeline = redis.pipeline()
+    pipeline.incr("a")
+    pipeline.set("b", "x", expire=10)
+    pipeline.mget("a", "b", "c")
+    commands = redis.commands
+
+    assert await pipeline.execute() == [2, True, [b"2", b"x", None]]
+    assert redis.commands == commands + 1
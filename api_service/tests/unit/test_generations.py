@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from core import config
+from db.fake_elastic import FakeElasticsearch, FakeIndex
+from db.fake_redis import FakeRedis
+from services.filmwork import FilmService
+from services.generations import generation_key
+from services.invalidation import handle_message
+
+MOVIE = {"id": "m1", "title": "First", "imdb_rating": 5.0}
+
+
+async def bump_cache_generation(redis: FakeRedis, index: str) -> int:
+    """
+    То же, что `ETL.bump_cache_generation` после полной переиндексации.
+    """
+    generation = await redis.incr(generation_key(index))
+    await handle_message(redis, {"index": index, "generation": generation})
+    return generation
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def es():
+    return FakeElasticsearch({"movies": [dict(MOVIE)]})
+
+
+@pytest.mark.asyncio
+async def test_generation_changes_keys(redis, es):
+    service = FilmService(redis, es)
+    old_key = await service._doc_key("m1")
+    assert b"First" in await service.get_by_id("m1")
+
+    es.indices["movies"] = FakeIndex([{**MOVIE, "title": "Reindexed"}])
+    generation = await bump_cache_generation(redis, "movies")
+
+    new_key = await service._doc_key("m1")
+    assert new_key != old_key
+    assert f"movies:{generation}:" in new_key
+    # Запись прежнего поколения осталась в Redis, но больше не читается
+    assert await redis.get(old_key) is not None
+    assert b"Reindexed" in await service.get_by_id("m1")
+    assert es.calls["get"] == 2
+
+
+@pytest.mark.asyncio
+async def test_missed_generation_message(redis, es, monkeypatch):
+    """
+    Без сообщения ETL поколение перечитывается из Redis через `CACHE_GENERATION_TTL_SECONDS`.
+    """
+    service = FilmService(redis, es)
+    old_key = await service._doc_key("m1")
+    await redis.incr(generation_key("movies"))
+    assert await service._doc_key("m1") == old_key
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + config.CACHE_GENERATION_TTL_SECONDS)
+    assert await service._doc_key("m1") != old_key
@@ -0,0 +1,68 @@
+import pytest
+
+from db.fake_elastic import FakeElasticsearch, FakeIndex
+from db.fake_redis import FakeRedis
+from services.filmwork import FilmService
+from services.invalidation import handle_message
+
+MOVIES = [
+    {"id": "m1", "title": "First", "imdb_rating": 5.0},
+    {"id": "m2", "title": "Second", "imdb_rating": 7.0},
+]
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def es():
+    return FakeElasticsearch({"movies": [dict(movie) for movie in MOVIES]})
+
+
+@pytest.fixture
+def service(redis, es):
+    return FilmService(redis, es)
+
+
+async def etl_upsert(redis: FakeRedis, es: FakeElasticsearch, doc: dict) -> None:
+    """
+    Обновляет документ и публикует изменение, как `ETL.publish_changes`.
+    """
+    docs = {**es.indices["movies"].docs, doc["id"]: doc}
+    es.indices["movies"] = FakeIndex(list(docs.values()))
+    list_generation = await redis.incr("cache-list-generation:movies")
+    await handle_message(redis, {"index": "movies", "ids": [doc["id"]], "list_generation": list_generation})
+
+
+@pytest.mark.asyncio
+async def test_new_document_evicts_lists(redis, es, service):
+    """
+    Новый фильм попадает в уже закэшированную страницу списка,
+    хотя ссылок на него у страницы нет.
+    """
+    url = "/api/v1/film/?sort=-imdb_rating"
+    assert await service.get_films(url, page_number=0, page_size=10, sort="-imdb_rating") == \
+        await service.get_films(url, page_number=0, page_size=10, sort="-imdb_rating")
+    assert es.calls["search"] == 1
+    # Страницы не записывают ссылки на каждый найденный документ
+    assert not [key for key in redis.data if key.startswith("refs:")]
+
+    await etl_upsert(redis, es, {"id": "m3", "title": "Third", "imdb_rating": 9.0})
+
+    body = await service.get_films(url, page_number=0, page_size=10, sort="-imdb_rating")
+    assert es.calls["search"] == 2
+    assert body.startswith(b'[{"id":"m3"')
+
+
+@pytest.mark.asyncio
+async def test_document_change_evicts_document(redis, es, service):
+    assert b"First" in await service.get_by_id("m1")
+    await service.get_by_id("m1")
+    assert es.calls["get"] == 1
+
+    await etl_upsert(redis, es, {"id": "m1", "title": "Renamed", "imdb_rating": 5.0})
+
+    assert b"Renamed" in await service.get_by_id("m1")
+    assert es.calls["get"] == 2
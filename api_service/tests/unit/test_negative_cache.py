@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from core import config
+from db.fake_elastic import FakeElasticsearch, FakeIndex
+from db.fake_redis import FakeRedis
+from services.filmwork import FilmService
+from services.invalidation import handle_message
+
+MOVIE = {"id": "m1", "title": "First", "imdb_rating": 5.0}
+
+
+@pytest.fixture
+def es():
+    return FakeElasticsearch({"movies": []})
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def service(redis, es):
+    return FilmService(redis, es)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Сдвигает время и для сроков записей кэша, и для времени жизни ключей FakeRedis.
+    """
+    offset = 0.0
+    wall, monotonic = time.time, time.monotonic
+
+    def advance(seconds: float) -> None:
+        nonlocal offset
+        offset += seconds
+
+    monkeypatch.setattr(time, "time", lambda: wall() + offset)
+    monkeypatch.setattr(time, "monotonic", lambda: monotonic() + offset)
+    return advance
+
+
+@pytest.mark.asyncio
+async def test_negative_entry_expires(es, service, clock):
+    assert await service.get_by_id("m1") is None
+    # Документ появился, но сообщения ETL не было
+    es.indices["movies"] = FakeIndex([MOVIE])
+    assert await service.get_by_id("m1") is None
+    assert es.calls["get"] == 1
+
+    clock(config.NEGATIVE_CACHE_TTL_SECONDS)
+    assert b"First" in await service.get_by_id("m1")
+    assert es.calls["get"] == 2
+
+
+@pytest.mark.asyncio
+async def test_upsert_evicts_negative_entry(redis, es, service):
+    assert await service.get_by_id("m1") is None
+    assert await service.get_many(["m1"]) == b"[]"
+
+    es.indices["movies"] = FakeIndex([MOVIE])
+    await handle_message(redis, {"index": "movies", "ids": ["m1"], "list_generation": 1})
+
+    assert b"First" in await service.get_by_id("m1")
+    assert b"First" in await service.get_many(["m1"])
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import elasticsearch
+import pytest
+from aiobreaker import CircuitBreakerError
+
+from core import config, context
+from db.fake_elastic import FakeElasticsearch
+from db.fake_redis import FakeRedis
+from services.base import RESPONSE_CACHE_EXPIRE_IN_SECONDS, STALE_WARNING
+from services.filmwork import FilmService
+
+MOVIE = {"id": "m1", "title": "First", "imdb_rating": 5.0}
+
+
+@pytest.fixture
+def es():
+    return FakeElasticsearch({"movies": [dict(MOVIE)]})
+
+
+@pytest.fixture
+def service(es):
+    return FilmService(FakeRedis(), es)
+
+
+@pytest.fixture(autouse=True)
+def no_local_cache(monkeypatch):
+    """
+    Записи читаются из Redis, где проверяются их сроки.
+    """
+    monkeypatch.setattr(config, "LOCAL_CACHE_TTL_SECONDS", 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Сдвигает время, по которому проверяются сроки записей кэша.
+    """
+    offset = 0.0
+    now = time.time
+
+    def advance(seconds: float) -> None:
+        nonlocal offset
+        offset += seconds
+
+    monkeypatch.setattr(time, "time", lambda: now() + offset)
+    return advance
+
+
+@pytest.fixture
+def headers():
+    """
+    Заголовки ответа, как их собирает `ResponseHeadersMiddleware`.
+    """
+    headers = {}
+    token = context.response_headers.set(headers)
+    yield headers
+    context.response_headers.reset(token)
+
+
+def elastic_down(es: FakeElasticsearch, monkeypatch) -> None:
+    async def get(**kwargs):
+        es.calls["get"] += 1
+        raise elasticsearch.ConnectionError("N/A", "Connection refused", None)
+
+    monkeypatch.setattr(es, "get", get)
+
+
+@pytest.mark.asyncio
+async def test_soft_ttl_refresh(es, service, clock):
+    """
+    Запись старше мягкого срока отдается сразу и обновляется в фоне.
+    """
+    assert b"First" in await service.get_by_id("m1")
+    es.indices["movies"].docs["m1"]["title"] = "Renamed"
+
+    clock(config.RESPONSE_CACHE_SOFT_TTL_SECONDS + 1)
+    assert b"First" in await service.get_by_id("m1")
+    while service._refreshing:
+        await asyncio.sleep(0)
+
+    assert es.calls["get"] == 2
+    assert b"Renamed" in await service.get_by_id("m1")
+    assert es.calls["get"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_if_error(es, service, clock, headers, monkeypatch):
+    """
+    Запись старше жесткого срока отдается с `Warning`, только если Elasticsearch недоступен.
+    """
+    assert b"First" in await service.get_by_id("m1")
+    clock(RESPONSE_CACHE_EXPIRE_IN_SECONDS + 1)
+    elastic_down(es, monkeypatch)
+
+    assert b"First" in await service.get_by_id("m1")
+    assert headers["Warning"] == STALE_WARNING
+
+    # Без записи в кэше ошибка доходит до обработчика
+    with pytest.raises(elasticsearch.ConnectionError):
+        await service.get_by_id("m2")
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker(es, service, clock, headers, monkeypatch):
+    """
+    После серии сбоев запросы к Elasticsearch не отправляются,
+    а устаревшие записи отдаются с `Warning`.
+    """
+    assert b"First" in await service.get_by_id("m1")
+    elastic_down(es, monkeypatch)
+    failed = es.calls["get"]
+
+    for id in range(10):
+        with pytest.raises((elasticsearch.ConnectionError, CircuitBreakerError)):
+            await service.get_by_id(f"missing-{id}")
+    assert es.calls["get"] - failed == 5
+
+    clock(RESPONSE_CACHE_EXPIRE_IN_SECONDS + 1)
+    assert b"First" in await service.get_by_id("m1")
+    assert headers["Warning"] == STALE_WARNING
+    assert es.calls["get"] - failed == 5
@@ -8,7 +8,7 @@ from core import db, Config, jwt
 from models import RefreshToken, User, LoginHistory, Role
 
 from .api_bp import bp
-from .errors import unauthorized
+from .errors import error_response, unauthorized
 from .utils import schemas
 from .utils.decorators import validate_request, superuser_required
 from .utils.auth_user import auth_user
@@ -214,3 +214,14 @@ def remove_role(data):
 @jwt_required()
 def authorize():
     return jsonify(roles=get_jwt().get("roles"))
+
+
+@bp.route("/public_key")
+def public_key():
+    """
+    Returns public key used by other services to verify access tokens locally
+    """
+    key = current_app.config.get("JWT_PUBLIC_KEY")
+    if not key:
+        return error_response(404, "Access tokens are signed with a symmetric key")
+    return jsonify(algorithm=current_app.config["JWT_ALGORITHM"], public_key=key)
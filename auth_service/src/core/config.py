@@ -2,12 +2,20 @@ import os
 
 from datetime import timedelta
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 
 basedir = Path(__file__).parent.parent
 
 
+def read_key(path: Optional[str]) -> Optional[str]:
+    """Read a PEM key from file, if path is set"""
+    if not path:
+        return None
+    with open(path) as key_file:
+        return key_file.read()
+
+
 class Config(object):
     # App
     SECRET_KEY: str = os.environ["SECRET_KEY"]
@@ -20,6 +28,10 @@ class Config(object):
     # JWT
     JWT_REFRESH_TOKEN_EXPIRES: int = int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRES', 365 * 24 * 60 * 60))
     JWT_ACCESS_TOKEN_EXPIRES: int = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 15 * 60))
+    # Asymmetric algorithm (RS256/ES256) lets other services verify access tokens locally
+    JWT_ALGORITHM: str = os.environ.get('JWT_ALGORITHM', 'HS256')
+    JWT_PRIVATE_KEY: Optional[str] = read_key(os.environ.get('JWT_PRIVATE_KEY_PATH'))
+    JWT_PUBLIC_KEY: Optional[str] = read_key(os.environ.get('JWT_PUBLIC_KEY_PATH'))
 
     # Redis
     REDIS_HOST: str = os.environ.get('REDIS_HOST', 'redis')
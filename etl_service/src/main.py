@@ -2,6 +2,7 @@ import os
 
 from psycopg2.extras import DictCursor
 import psycopg2
+import redis
 
 from services.ETL import ETL
 
@@ -12,6 +13,8 @@ if __name__ == '__main__':
                 **dsl, cursor_factory=DictCursor) as pg_conn:
         es_host = os.environ['ELASTIC_HOST']
         es_port = os.environ['ELASTIC_PORT']
-        mergePipe = ETL(file_path='state.json', pg_conn=pg_conn, es_url=f"http://{es_host}:{es_port}/", dsl=dsl)
+        redis_conn = redis.Redis(host=os.environ.get('REDIS_HOST', 'redis'), port=int(os.environ.get('REDIS_PORT', 6379)))
+        mergePipe = ETL(file_path='state.json', pg_conn=pg_conn, es_url=f"http://{es_host}:{es_port}/", dsl=dsl,
+                        redis_conn=redis_conn)
         mergePipe.initial_update()
         mergePipe.start_merge()
\ No newline at end of file
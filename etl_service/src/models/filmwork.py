@@ -11,3 +11,4 @@ class FilmWork(BaseModel):
     actors = []
     directors = []
     description: Optional[str]
+    type: Optional[str]
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class Suggestion(BaseModel):
+    """
+    запись индекса подсказок для строки поиска: фильм или участник
+    """
+    id: str
+    type: str
+    name: str
+    suggest: dict
+
+    @classmethod
+    def create(cls, id: str, type: str, name: str, weight: Optional[int] = None) -> 'Suggestion':
+        # подсказка должна находиться по началу любого слова, а не только по началу названия
+        words = name.split()
+        inputs = [' '.join(words[i:]) for i in range(len(words))]
+        return cls(id=id, type=type, name=name, suggest={'input': inputs, 'weight': weight or 1})
@@ -1,24 +1,45 @@
 from datetime import datetime, timezone, timedelta
 import json
+import os
 import time
 import logging
-from typing import Callable
+from typing import Callable, Optional
 
 from elasticsearch import Elasticsearch, exceptions, helpers
 import psycopg2
 import backoff
+import redis
 from psycopg2.extras import DictCursor
 
 from .state_class import JsonFileStorage, State
 from models.filmwork import FilmWork
 from models.genre import Genre
 from models.person import Person
+from models.suggestion import Suggestion
 from .coroutine import coroutine
 from .queries import movies_query, genres_query, persons_query
 
+# канал, из которого api_service узнает об измененных документах
+CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL', 'cache-invalidation')
+
+# индексы с явной схемой, остальные создаются с динамической
+INDEX_BODIES = {
+    'suggest': {
+        'mappings': {
+            'properties': {
+                'id': {'type': 'keyword'},
+                'type': {'type': 'keyword'},
+                'name': {'type': 'keyword', 'index': False},
+                'suggest': {'type': 'completion'},
+            }
+        }
+    }
+}
+
 
 class ETL:
-    def __init__(self, file_path: str, pg_conn: psycopg2.connect, es_url: str, dsl: dict):
+    def __init__(self, file_path: str, pg_conn: psycopg2.connect, es_url: str, dsl: dict,
+                 redis_conn: Optional[redis.Redis] = None):
         self.conn = pg_conn
         self.cursor = self.conn.cursor()
         self.dsl = dsl
@@ -27,6 +48,9 @@ class ETL:
         self.storage = JsonFileStorage(file_path)
         self.postgresState = State(self.storage)
         self.es = Elasticsearch(es_url)
+        self.redis = redis_conn
+        # во время полной загрузки кэш сбрасывается сменой поколения, а не по отдельным id
+        self.initial_loading = False
         logging.basicConfig(level=logging.WARNING)
         logging.getLogger('backoff').addHandler(logging.StreamHandler())
 
@@ -37,16 +61,18 @@ class ETL:
         в postgres генерируются заново, и использовать существующие записи в es не удастся
         """
         self.es.indices.delete(index=index_name, ignore=404)
-        self.es.indices.create(index=index_name)
+        self.es.indices.create(index=index_name, body=INDEX_BODIES.get(index_name))
 
     def initial_update(self):
         """
         заносит все записи из Postgres в ES и устанавливает время обновления
         """
         logging.warning('Wait while all data will be loaded to ES...')
+        self.initial_loading = True
         self.clear_index_data('movies')
         self.clear_index_data('genres')
         self.clear_index_data('persons')
+        self.clear_index_data('suggest')
         updater = self.update_es()
         transform = self.transform_received(updater)
         self.initial_load_from_psql(transform)
@@ -55,6 +81,9 @@ class ETL:
         cur_time = (datetime.now(timezone.utc)).strftime("%m-%d-%Y %H:%M:%S")
         for table_name in self.main_tables:
             self.postgresState.set_state(table_name, cur_time)
+        self.initial_loading = False
+        for index_name in ('movies', 'genres', 'persons', 'suggest'):
+            self.bump_cache_generation(index_name)
         logging.warning('Now ES is up-to-date with postgres')
 
     def initial_load_from_psql(self, target: Callable):
@@ -92,6 +121,38 @@ class ETL:
             "doc_as_upsert": True
         } for instance in data]
         helpers.bulk(self.es, doc_data)
+        self.publish_changes(index, [instance.id for instance in data])
+
+    def publish_changes(self, index: str, ids: list):
+        """
+        сообщает api_service об измененных документах, чтобы он удалил построенные из них записи кэша.
+        Новое поколение списков индекса сбрасывает страницы списков и поиска: изменение может
+        затронуть страницы, в которых этих документов нет.
+        Ошибка публикации не останавливает ETL: устаревшие записи в любом случае истекут по TTL
+        """
+        if self.redis is None or self.initial_loading or not ids:
+            return
+        try:
+            list_generation = self.redis.incr(f'cache-list-generation:{index}')
+            self.redis.publish(
+                CACHE_INVALIDATION_CHANNEL,
+                json.dumps({'index': index, 'ids': ids, 'list_generation': list_generation}),
+            )
+        except redis.RedisError as e:
+            logging.warning(f"""Can't publish changes of {index}: {e}""")
+
+    def bump_cache_generation(self, index: str):
+        """
+        после переиндексации начинает новое поколение кэша api_service для индекса:
+        записи предыдущего поколения больше не используются и истекают сами
+        """
+        if self.redis is None:
+            return
+        try:
+            generation = self.redis.incr(f'cache-generation:{index}')
+            self.redis.publish(CACHE_INVALIDATION_CHANNEL, json.dumps({'index': index, 'generation': generation}))
+        except redis.RedisError as e:
+            logging.warning(f"""Can't bump cache generation of {index}: {e}""")
 
     @coroutine
     def update_es(self):
@@ -119,7 +180,7 @@ class ETL:
                     filmwork = next((item for item in data if item.id == fw_id), False)
                     if not filmwork:
                         data.append(FilmWork(id=row['fw_id'], title=row['title'], imdb_rating=row["rating"],
-                                                       description=row['description']))
+                                                       description=row['description'], type=row['filmwork_type']))
                         filmwork = data[-1]
                     role_name = row['role']
                     if role_name:
@@ -154,6 +215,23 @@ class ETL:
                         person.role.append(role)
 
             target.send({'index': index, 'data': data})
+            suggestions = self.make_suggestions(index, data)
+            if suggestions:
+                target.send({'index': 'suggest', 'data': suggestions})
+
+    @staticmethod
+    def make_suggestions(index: str, data: list) -> list:
+        """
+        записи индекса подсказок для фильмов и участников. Популярные фильмы и
+        участники с большим числом фильмов поднимаются в подсказках выше
+        """
+        if index == 'movies':
+            return [Suggestion.create(filmwork.id, 'film', filmwork.title, int((filmwork.imdb_rating or 0) * 10))
+                    for filmwork in data]
+        if index == 'persons':
+            return [Suggestion.create(person.id, 'person', f"""{person.first_name} {person.last_name}""",
+                                      len(person.film_ids)) for person in data]
+        return []
 
     @coroutine
     def get_associated_instances(self, target: Callable):